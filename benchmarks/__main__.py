@@ -0,0 +1,239 @@
+import click
+
+from benchmarks import baseline
+from benchmarks.imports import measure_imports
+from benchmarks.load import run_load
+from benchmarks.models import STAGES, measure
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command()
+@click.option(
+    "--size",
+    "sizes",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=[1000, 10000, 20000, 100000],
+    show_default=True,
+    help="Number of synthetic devices, may be repeated",
+)
+@click.option(
+    "--stage",
+    "stage_names",
+    type=click.Choice([stage.name for stage in STAGES]),
+    multiple=True,
+    help="Only run the given stage, may be repeated",
+)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=3,
+    show_default=True,
+    help="Timed runs per stage, the fastest is reported",
+)
+@click.option(
+    "--save",
+    "save_path",
+    type=click.Path(dir_okay=False),
+    help="Write results as a baseline file",
+)
+@click.option(
+    "--compare",
+    "compare_path",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Fail if results regress against a baseline file",
+)
+@click.option(
+    "--tolerance",
+    type=click.FloatRange(min=0),
+    default=0.25,
+    show_default=True,
+    help="Allowed regression ratio when comparing against a baseline",
+)
+def models(
+    sizes: tuple[int],
+    stage_names: tuple[str],
+    repeat: int,
+    save_path: str,
+    compare_path: str,
+    tolerance: float,
+):
+    stages = [stage for stage in STAGES if not stage_names or stage.name in stage_names]
+    results = []
+    click.echo(f"{'stage':<28}{'size':>8}{'seconds':>12}{'peak MiB':>12}")
+    for size in sizes:
+        for stage in stages:
+            if stage.max_size is not None and size > stage.max_size:
+                continue
+            result = measure(stage, size, repeat)
+            results.append(result)
+            click.echo(
+                f"{result.stage:<28}{result.size:>8}{result.seconds:>12.4f}"
+                f"{result.peak_bytes / 2 ** 20:>12.2f}"
+            )
+    if save_path:
+        baseline.save(save_path, results)
+        click.echo(f"Baseline written to {save_path}")
+    if compare_path:
+        regressions = baseline.compare(compare_path, results, tolerance)
+        for regression in regressions:
+            click.secho(f"Regression: {regression}", fg="red")
+        if regressions:
+            raise click.ClickException(f"{len(regressions)} regressions found")
+        click.echo("No regressions found")
+
+
+@cli.command(context_settings={"ignore_unknown_options": True})
+@click.option(
+    "--devices",
+    type=click.IntRange(min=1),
+    default=1000,
+    show_default=True,
+    help="Number of Eero devices served by the fake Eero API",
+)
+@click.option(
+    "--existing-ratio",
+    type=click.FloatRange(0, 1),
+    default=0.9,
+    show_default=True,
+    help="Share of Eero devices already present in the fake AdGuard Home",
+)
+@click.option(
+    "--changed-ratio",
+    type=click.FloatRange(0, 1),
+    default=0.05,
+    show_default=True,
+    help="Share of existing AdGuard clients whose name differs from Eero",
+)
+@click.option(
+    "--latency",
+    type=click.FloatRange(min=0),
+    default=0,
+    show_default=True,
+    help="Seconds of latency added to every fake server response",
+)
+@click.option(
+    "--latency-jitter",
+    type=click.FloatRange(min=0),
+    default=0,
+    show_default=True,
+    help="Maximum random seconds added on top of --latency",
+)
+@click.option(
+    "--error-rate",
+    type=click.FloatRange(0, 1),
+    default=0,
+    show_default=True,
+    help="Share of fake server responses replaced with HTTP 500",
+)
+@click.option(
+    "--runs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Consecutive syncs against the same fake servers",
+)
+@click.option(
+    "--show-output", is_flag=True, default=False, help="Print eag-sync output"
+)
+@click.argument("sync_args", nargs=-1, type=click.UNPROCESSED)
+def load(
+    devices: int,
+    existing_ratio: float,
+    changed_ratio: float,
+    latency: float,
+    latency_jitter: float,
+    error_rate: float,
+    runs: int,
+    show_output: bool,
+    sync_args: tuple[str],
+):
+    results = run_load(
+        devices,
+        existing_ratio,
+        changed_ratio,
+        latency,
+        latency_jitter,
+        error_rate,
+        runs,
+        sync_args,
+    )
+    for result in results:
+        if show_output:
+            click.echo(result.output)
+        status = "ok" if result.exit_code == 0 else f"exit code {result.exit_code}"
+        click.echo(
+            f"Run {result.run}: {result.seconds:.2f}s, "
+            f"{result.request_count} requests, {status}"
+        )
+        click.echo(
+            f"  {'endpoint':<36}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}"
+        )
+        for endpoint in result.endpoints:
+            click.echo(
+                f"  {endpoint.endpoint:<36}{endpoint.count:>8}{endpoint.errors:>8}"
+                f"{endpoint.p50 * 1000:>10.1f}{endpoint.p99 * 1000:>10.1f}"
+            )
+
+
+@cli.command()
+@click.option(
+    "--command",
+    "commands",
+    multiple=True,
+    default=["--version"],
+    show_default=True,
+    help="eag-sync arguments to time, may be repeated",
+)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=5,
+    show_default=True,
+    help="Runs per command, the fastest is reported",
+)
+@click.option(
+    "--budget",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Fail if a command spends more milliseconds importing modules",
+)
+@click.option(
+    "--forbid",
+    multiple=True,
+    help="Fail if a command imports this module, may be repeated",
+)
+def imports(
+    commands: tuple[str],
+    repeat: int,
+    budget: float,
+    forbid: tuple[str],
+):
+    failures = []
+    for command in commands:
+        result, imported = measure_imports(command, repeat)
+        click.echo(
+            f"eag-sync {command}: {result.seconds * 1000:.1f}ms total, "
+            f"{result.import_seconds * 1000:.1f}ms importing"
+        )
+        for module, seconds in result.slowest(5):
+            click.echo(f"  {module:<40}{seconds * 1000:>10.1f}ms")
+        if budget and result.import_seconds * 1000 > budget:
+            failures.append(
+                f"eag-sync {command} imports took {result.import_seconds * 1000:.1f}ms, "
+                f"over the {budget:g}ms budget"
+            )
+        for module in forbid:
+            if module in imported:
+                failures.append(f"eag-sync {command} imported '{module}'")
+    for failure in failures:
+        click.secho(f"Regression: {failure}", fg="red")
+    if failures:
+        raise click.ClickException(f"{len(failures)} regressions found")
+
+
+if __name__ == "__main__":
+    cli()
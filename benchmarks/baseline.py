@@ -0,0 +1,31 @@
+import json
+
+
+def save(path: str, results: list):
+    data = {
+        result.key: {"seconds": result.seconds, "peak_bytes": result.peak_bytes}
+        for result in results
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def compare(path: str, results: list, tolerance: float) -> list[str]:
+    with open(path, "r") as f:
+        baseline = json.load(f)
+    regressions = []
+    for result in results:
+        expected = baseline.get(result.key)
+        if not expected:
+            continue
+        for field, actual in [
+            ("seconds", result.seconds),
+            ("peak_bytes", result.peak_bytes),
+        ]:
+            limit = expected[field] * (1 + tolerance)
+            if actual > limit:
+                regressions.append(
+                    f"{result.key} {field}: {actual:.4g} > {expected[field]:.4g} "
+                    f"(+{(actual / expected[field] - 1) * 100:.0f}%)"
+                )
+    return regressions
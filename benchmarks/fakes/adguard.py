@@ -0,0 +1,140 @@
+import ipaddress
+import re
+import secrets
+import threading
+from typing import Optional
+
+from benchmarks.fakes.base import FakeRequest, FakeResponse, FakeServer
+
+MAC_PATTERN = re.compile(
+    r"([0-9a-f]{2}[-:]){5}[0-9a-f]{2}|([0-9a-f]{4}\.){2}[0-9a-f]{4}", re.IGNORECASE
+)
+
+
+def normalize_id(identifier: str) -> str:
+    # AdGuard Home stores ids in canonical form, whatever spelling was sent
+    try:
+        return ipaddress.ip_address(identifier).compressed
+    except ValueError:
+        pass
+    if "/" in identifier:
+        try:
+            return str(ipaddress.ip_network(identifier, strict=False))
+        except ValueError:
+            pass
+    if MAC_PATTERN.fullmatch(identifier):
+        digits = re.sub(r"[-:.]", "", identifier).lower()
+        return ":".join(digits[i : i + 2] for i in range(0, 12, 2))
+    return identifier.lower()
+
+
+def normalize_client(client: dict) -> dict:
+    ids = client.get("ids")
+    if not ids:
+        return client
+    return {**client, "ids": list(dict.fromkeys(normalize_id(i) for i in ids))}
+
+
+class FakeAdGuardServer(FakeServer):
+    session_cookie = "agh_session"
+
+    def __init__(self, clients: list[dict] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.clients: dict[str, dict] = {}
+        self.sessions: set[str] = set()
+        self.clients_lock = threading.Lock()
+        for client in clients or []:
+            self.clients[client["name"]] = normalize_client(client)
+
+    def __authorized(self, request: FakeRequest) -> bool:
+        return request.cookies.get(self.session_cookie) in self.sessions
+
+    def __find_id_owner(self, ids: list[str], exclude: str = None) -> Optional[str]:
+        wanted = {normalize_id(i) for i in ids}
+        for name, client in self.clients.items():
+            if name != exclude and wanted & set(client["ids"]):
+                return name
+        return None
+
+    def __check(self, data: dict, exclude: str = None) -> Optional[FakeResponse]:
+        if not data.get("name") or not data.get("ids"):
+            return FakeResponse(400, "invalid client", "text/plain")
+        if data["name"] != exclude and data["name"] in self.clients:
+            return FakeResponse(
+                400, f"client already exists: {data['name']!r}", "text/plain"
+            )
+        owner = self.__find_id_owner(data["ids"], exclude)
+        if owner is not None:
+            return FakeResponse(
+                400,
+                f"another client uses the same id: {owner!r}",
+                "text/plain",
+            )
+        return None
+
+    def route(self, request: FakeRequest) -> FakeResponse:
+        if request.path == "/control/login" and request.method == "POST":
+            token = secrets.token_hex(16)
+            with self.clients_lock:
+                self.sessions.add(token)
+            return FakeResponse(
+                200,
+                "OK",
+                "text/plain",
+                {"Set-Cookie": f"{self.session_cookie}={token}; Path=/; HttpOnly"},
+            )
+        if not self.__authorized(request):
+            return FakeResponse(403, "Forbidden", "text/plain")
+        data = request.json or {}
+        if "data" in data:
+            data = {**data, "data": normalize_client(data["data"])}
+        else:
+            data = normalize_client(data)
+        with self.clients_lock:
+            if request.path == "/control/clients" and request.method == "GET":
+                return FakeResponse(
+                    200,
+                    {
+                        "clients": list(self.clients.values()),
+                        "auto_clients": [],
+                        "supported_tags": [],
+                    },
+                )
+            if request.path == "/control/clients/find" and request.method == "GET":
+                results = []
+                for i in range(len(request.query)):
+                    identifier = request.query.get(f"ip{i}", [None])[0]
+                    if identifier is None:
+                        break
+                    owner = self.__find_id_owner([identifier])
+                    if owner is None:
+                        client = {"name": "", "ids": [identifier], "disallowed": False}
+                    else:
+                        client = {**self.clients[owner], "disallowed": False}
+                    results.append({identifier: client})
+                return FakeResponse(200, results)
+            if request.path == "/control/clients/add" and request.method == "POST":
+                error = self.__check(data)
+                if error:
+                    return error
+                self.clients[data["name"]] = data
+                return FakeResponse(200, "OK", "text/plain")
+            if request.path == "/control/clients/update" and request.method == "POST":
+                name = data.get("name")
+                if name not in self.clients:
+                    return FakeResponse(
+                        400, f"client not found: {name!r}", "text/plain"
+                    )
+                error = self.__check(data.get("data", {}), exclude=name)
+                if error:
+                    return error
+                del self.clients[name]
+                self.clients[data["data"]["name"]] = data["data"]
+                return FakeResponse(200, "OK", "text/plain")
+            if request.path == "/control/clients/delete" and request.method == "POST":
+                if self.clients.pop(data.get("name"), None) is None:
+                    return FakeResponse(
+                        400, f"client not found: {data.get('name')!r}", "text/plain"
+                    )
+                return FakeResponse(200, "OK", "text/plain")
+        return FakeResponse(404, "Not Found", "text/plain")
@@ -0,0 +1,150 @@
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeResponse:
+    def __init__(
+        self,
+        status: int = 200,
+        body=None,
+        content_type: str = "application/json",
+        headers: dict = None,
+    ):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+        self.status = status
+        self.body = (body or "").encode("utf-8")
+        self.content_type = content_type
+        self.headers = headers or {}
+
+
+class FakeRequest:
+    def __init__(self, handler: BaseHTTPRequestHandler):
+        parsed_url = urlparse(handler.path)
+        self.method = handler.command
+        self.path = parsed_url.path
+        self.query = parse_qs(parsed_url.query)
+        self.headers = handler.headers
+        length = int(handler.headers.get("Content-Length") or 0)
+        raw_body = handler.rfile.read(length) if length else b""
+        self.json = json.loads(raw_body) if raw_body else None
+
+    @property
+    def cookies(self) -> dict[str, str]:
+        cookies = {}
+        for part in (self.headers.get("Cookie") or "").split(";"):
+            if "=" in part:
+                key, value = part.strip().split("=", 1)
+                cookies[key] = value
+        return cookies
+
+
+class FakeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes, with Nagle on a kept alive
+    # connection waits for the delayed ACK before sending the body
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args):
+        pass
+
+    def __handle(self):
+        fake: FakeServer = self.server.fake
+        start = time.perf_counter()
+        request = FakeRequest(self)
+        endpoint = fake.endpoint_name(request)
+        fake.delay()
+        if fake.should_fail():
+            response = FakeResponse(500, "injected failure", "text/plain")
+        else:
+            response = fake.route(request)
+        self.send_response(response.status)
+        self.send_header("Content-Type", response.content_type)
+        self.send_header("Content-Length", str(len(response.body)))
+        for key, value in response.headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(response.body)
+        fake.record(endpoint, time.perf_counter() - start, response.status)
+
+    do_GET = __handle
+    do_POST = __handle
+
+
+class FakeServer:
+    def __init__(
+        self,
+        latency: float = 0,
+        latency_jitter: float = 0,
+        error_rate: float = 0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.lock = threading.Lock()
+        self.__server: Optional[ThreadingHTTPServer] = None
+        self.__thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "FakeServer":
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host: str = "127.0.0.1", port: int = 0):
+        self.__server = ThreadingHTTPServer((host, port), FakeRequestHandler)
+        self.__server.daemon_threads = True
+        self.__server.fake = self
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever, daemon=True
+        )
+        self.__thread.start()
+
+    def stop(self):
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+    def delay(self):
+        with self.lock:
+            seconds = self.latency + self.random.uniform(0, self.latency_jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.error_rate > 0 and self.random.random() < self.error_rate
+
+    def record(self, endpoint: str, seconds: float, status: int):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            if status >= 400:
+                self.errors[endpoint] += 1
+
+    def reset_stats(self):
+        with self.lock:
+            self.latencies.clear()
+            self.errors.clear()
+
+    def endpoint_name(self, request: FakeRequest) -> str:
+        return f"{request.method} {request.path}"
+
+    def route(self, request: FakeRequest) -> FakeResponse:
+        raise NotImplementedError
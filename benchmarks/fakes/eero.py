@@ -0,0 +1,67 @@
+import re
+
+from benchmarks.fakes.base import FakeRequest, FakeResponse, FakeServer
+
+
+class FakeEeroServer(FakeServer):
+    api_version = "2.2"
+
+    def __init__(
+        self,
+        networks: dict[str, tuple[list[dict], list[dict]]] = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.networks = networks or {}
+
+    @property
+    def api_endpoint(self) -> str:
+        return f"{self.url}/{self.api_version}/{{}}"
+
+    def network_url(self, network_id: int) -> str:
+        return f"/{self.api_version}/networks/{network_id}"
+
+    @staticmethod
+    def __response(data, code: int = 200) -> FakeResponse:
+        return FakeResponse(200, {"meta": {"code": code}, "data": data})
+
+    def endpoint_name(self, request: FakeRequest) -> str:
+        path = re.sub(r"/networks/\d+", "/networks/{id}", request.path)
+        return f"{request.method} {path}"
+
+    def route(self, request: FakeRequest) -> FakeResponse:
+        prefix = f"/{self.api_version}/"
+        if not request.path.startswith(prefix):
+            return FakeResponse(404, "Not Found", "text/plain")
+        action = request.path[len(prefix) :]
+        if action == "login":
+            return self.__response({"user_token": "fake-user-token"})
+        if action in ("login/verify", "login/refresh"):
+            return self.__response({"user_token": "fake-user-token"})
+        if not request.cookies.get("s"):
+            return FakeResponse(
+                200, {"meta": {"code": 401, "error": "error.session.invalid"}}
+            )
+        if action == "account":
+            return self.__response(
+                {
+                    "log_id": "1000",
+                    "networks": {
+                        "count": len(self.networks),
+                        "data": [
+                            {"name": name, "url": self.network_url(i)}
+                            for i, name in enumerate(self.networks)
+                        ],
+                    },
+                }
+            )
+        match = re.fullmatch(r"networks/(\d+)/(devices|eeros)", action)
+        if match:
+            network_id, resource = int(match.group(1)), match.group(2)
+            if network_id >= len(self.networks):
+                return FakeResponse(
+                    200, {"meta": {"code": 404, "error": "error.network.not_found"}}
+                )
+            devices, eeros = list(self.networks.values())[network_id]
+            return self.__response(devices if resource == "devices" else eeros)
+        return FakeResponse(404, "Not Found", "text/plain")
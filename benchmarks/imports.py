@@ -0,0 +1,61 @@
+import re
+import shlex
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+
+IMPORT_TIME_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+@dataclass
+class ImportResult:
+    command: str
+    seconds: float
+    import_seconds: float
+    modules: dict[str, float] = field(default_factory=dict)
+
+    def slowest(self, count: int) -> list[tuple[str, float]]:
+        return sorted(self.modules.items(), key=lambda i: i[1], reverse=True)[:count]
+
+
+def import_times(args: list[str]) -> tuple[float, dict[str, float], dict[str, float]]:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    seconds = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"'{shlex.join(args)}' exited with {proc.returncode}")
+    top_level = {}
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if not match:
+            continue
+        cumulative = int(match.group(2)) / 1e6
+        modules[match.group(4)] = cumulative
+        if len(match.group(3)) == 1:
+            top_level[match.group(4)] = cumulative
+    return seconds, top_level, modules
+
+
+def measure_imports(command: str, repeat: int) -> tuple[ImportResult, set[str]]:
+    # Interpreter startup imports (site, encodings...) aren't ours to optimize
+    _, startup, _ = import_times(["-c", "pass"])
+    best = None
+    imported = set()
+    for _ in range(repeat):
+        seconds, top_level, modules = import_times(
+            ["-m", "eero_adguard_sync", *shlex.split(command)]
+        )
+        own = {k: v for k, v in top_level.items() if k not in startup}
+        result = ImportResult(command, seconds, sum(own.values()), own)
+        if best is None or result.import_seconds < best.import_seconds:
+            best = result
+        imported = set(modules)
+    return best, imported
@@ -0,0 +1,187 @@
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Optional
+from unittest import mock
+
+import eero
+from click.testing import CliRunner
+
+from benchmarks import payloads
+from benchmarks.fakes.adguard import FakeAdGuardServer
+from benchmarks.fakes.eero import FakeEeroServer
+from eero_adguard_sync.client import EeroClient
+from eero_adguard_sync.main import cli
+from eero_adguard_sync.utils import (
+    FingerprintStore,
+    OperationJournal,
+    SessionCache,
+    metrics,
+)
+
+
+@dataclass
+class EndpointStats:
+    endpoint: str
+    count: int
+    errors: int
+    p50: float
+    p99: float
+
+
+@dataclass
+class LoadResult:
+    run: int
+    exit_code: int
+    seconds: float
+    output: str
+    endpoints: list[EndpointStats] = field(default_factory=list)
+
+    @property
+    def request_count(self) -> int:
+        return sum(i.count for i in self.endpoints)
+
+
+def percentile(values: list[float], ratio: float) -> float:
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(ratio * len(ordered)) - 1)]
+
+
+class RequestRecorder:
+    # Timed where the sync sends requests, so client and socket delays count too
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.lock = threading.Lock()
+        self.__observe = metrics.observe_request
+
+    def __call__(
+        self,
+        service: str,
+        method: str,
+        url: str,
+        status: Optional[int],
+        seconds: float,
+    ):
+        self.__observe(service, method, url, status, seconds)
+        endpoint = f"{method.upper()} {metrics.endpoint(url)}"
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            if status is None or status >= 400:
+                self.errors[endpoint] += 1
+
+    def reset(self):
+        with self.lock:
+            self.latencies.clear()
+            self.errors.clear()
+
+    def stats(self) -> list[EndpointStats]:
+        with self.lock:
+            return [
+                EndpointStats(
+                    endpoint,
+                    len(latencies),
+                    self.errors.get(endpoint, 0),
+                    percentile(latencies, 0.5),
+                    percentile(latencies, 0.99),
+                )
+                for endpoint, latencies in sorted(self.latencies.items())
+            ]
+
+
+def run_load(
+    devices: int,
+    existing_ratio: float = 0.9,
+    changed_ratio: float = 0.05,
+    latency: float = 0,
+    latency_jitter: float = 0,
+    error_rate: float = 0,
+    runs: int = 1,
+    sync_args: tuple[str] = (),
+) -> list[LoadResult]:
+    eero_devices = payloads.eero_devices(devices)
+    adguard_clients = payloads.adguard_clients(
+        eero_devices, overlap=existing_ratio, changed=changed_ratio
+    )["clients"]
+    server_options = dict(
+        latency=latency, latency_jitter=latency_jitter, error_rate=error_rate
+    )
+    eero_server = FakeEeroServer(
+        {"Load test": (eero_devices, payloads.eero_network_devices(3))},
+        **server_options,
+    )
+    adguard_server = FakeAdGuardServer(adguard_clients, **server_options)
+    recorder = RequestRecorder()
+    results = []
+    with ExitStack() as stack:
+        data_path = stack.enter_context(tempfile.TemporaryDirectory())
+        stack.enter_context(eero_server)
+        stack.enter_context(adguard_server)
+        stack.enter_context(mock.patch.object(metrics, "observe_request", recorder))
+        stack.enter_context(
+            mock.patch.object(
+                eero.client.Client, "API_ENDPOINT", eero_server.api_endpoint
+            )
+        )
+        stack.enter_context(
+            mock.patch.object(
+                EeroClient, "cookie_path", os.path.join(data_path, "session.cookie")
+            )
+        )
+        stack.enter_context(
+            mock.patch.object(
+                FingerprintStore,
+                "default_path",
+                os.path.join(data_path, "fingerprints.json"),
+            )
+        )
+        stack.enter_context(
+            mock.patch.object(
+                SessionCache,
+                "default_path",
+                os.path.join(data_path, "sessions.json"),
+            )
+        )
+        stack.enter_context(
+            mock.patch.object(
+                OperationJournal,
+                "default_path",
+                os.path.join(data_path, "journal.jsonl"),
+            )
+        )
+        args = [
+            "sync",
+            "--eero-cookie",
+            "load-test",
+            "--adguard-host",
+            adguard_server.url,
+            "--adguard-user",
+            "admin",
+            "--adguard-password",
+            "password",
+            "-y",
+            *sync_args,
+        ]
+        runner = CliRunner()
+        for run in range(1, runs + 1):
+            recorder.reset()
+            start = time.perf_counter()
+            result = runner.invoke(cli, args)
+            elapsed = time.perf_counter() - start
+            results.append(
+                LoadResult(
+                    run,
+                    result.exit_code,
+                    elapsed,
+                    result.output,
+                    recorder.stats(),
+                )
+            )
+    return results
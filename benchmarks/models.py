@@ -0,0 +1,141 @@
+import gc
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from benchmarks import payloads
+from eero_adguard_sync.client import AdGuardClient, EeroClient
+from eero_adguard_sync.models import (
+    AdGuardClientDevice,
+    DHCPClientTable,
+    EeroClientDevice,
+    EeroNetworkDevice,
+)
+from eero_adguard_sync.sync import SyncPlanner
+
+
+@dataclass
+class Stage:
+    name: str
+    setup: Callable[[int], Any]
+    run: Callable[[Any], Any]
+    # Whole sync stages get slow to profile on the largest sizes
+    max_size: Optional[int] = None
+
+
+@dataclass
+class StageResult:
+    stage: str
+    size: int
+    seconds: float
+    peak_bytes: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.stage}/{self.size}"
+
+
+def eero_client_devices(size: int) -> list[EeroClientDevice]:
+    devices = []
+    for device in payloads.eero_devices(size):
+        devices.append(
+            EeroClientDevice(**{k: device[k] for k in EeroClient.device_model_fields})
+        )
+    for device in payloads.eero_network_devices(3):
+        devices.append(
+            EeroNetworkDevice(
+                **{k: device[k] for k in EeroClient.eero_model_fields}
+            ).as_client_device()
+        )
+    return devices
+
+
+def adguard_payload(size: int) -> dict:
+    return payloads.adguard_clients(payloads.eero_devices(size))
+
+
+def adguard_body(size: int) -> list[bytes]:
+    body = json.dumps(adguard_payload(size)).encode("utf-8")
+    chunk_size = AdGuardClient.stream_chunk_size
+    return [body[i : i + chunk_size] for i in range(0, len(body), chunk_size)]
+
+
+def dhcp_tables(size: int) -> tuple[DHCPClientTable, DHCPClientTable]:
+    eero_table = DHCPClientTable(
+        [i.to_dhcp_client() for i in eero_client_devices(size)]
+    )
+    adguard_table = DHCPClientTable(
+        [i.to_dhcp_client() for i in AdGuardClient.parse_clients(adguard_payload(size))]
+    )
+    return eero_table, adguard_table
+
+
+def quiet_planner() -> SyncPlanner:
+    return SyncPlanner(lambda message, **styles: None)
+
+
+STAGES = [
+    Stage(
+        "eero.to_dhcp_client",
+        eero_client_devices,
+        lambda devices: [i.to_dhcp_client() for i in devices],
+    ),
+    Stage("adguard.parse_clients", adguard_payload, AdGuardClient.parse_clients),
+    Stage(
+        "adguard.iter_clients",
+        adguard_body,
+        lambda chunks: list(AdGuardClient.iter_clients(chunks)),
+    ),
+    Stage(
+        "adguard.to_dhcp_client",
+        lambda size: AdGuardClient.parse_clients(adguard_payload(size)),
+        lambda clients: [i.to_dhcp_client() for i in clients],
+    ),
+    Stage(
+        "dhcp.identifiers",
+        lambda size: dhcp_tables(size)[0].clients,
+        lambda clients: [i.identifiers for i in clients],
+    ),
+    Stage(
+        "dhcp.table",
+        lambda size: [i.clients for i in dhcp_tables(size)],
+        lambda tables: [DHCPClientTable(list(i)) for i in tables],
+    ),
+    Stage(
+        "dhcp.compare",
+        dhcp_tables,
+        lambda tables: tables[1].compare(tables[0], AdGuardClientDevice),
+    ),
+    Stage(
+        "sync.resolve_conflicts",
+        dhcp_tables,
+        lambda tables: quiet_planner().resolve_conflicts(*tables),
+        20000,
+    ),
+    Stage(
+        "sync.diff",
+        dhcp_tables,
+        lambda tables: quiet_planner().diff(*tables),
+        20000,
+    ),
+]
+
+
+def measure(stage: Stage, size: int, repeat: int = 3) -> StageResult:
+    data = stage.setup(size)
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        stage.run(data)
+        timings.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        stage.run(data)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return StageResult(stage.name, size, min(timings), peak_bytes)
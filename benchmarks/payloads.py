@@ -0,0 +1,91 @@
+import random
+
+from eero_adguard_sync.models.eero.client_device import CLIENT_TAG_MAP
+
+DEVICE_TYPES = list(CLIENT_TAG_MAP)
+
+
+def mac_address(i: int) -> str:
+    return ":".join(f"{b:02x}" for b in (0x02, 0xEA, *(i.to_bytes(4, "big"))))
+
+
+def ipv4_address(i: int) -> str:
+    return f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+
+def ipv6_address(i: int, rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return f"fe80::{rng.getrandbits(16):x}:{rng.getrandbits(16):x}:{i & 0xFFFF:x}"
+    return f"2001:db8:{(i >> 16) & 0xFFFF:x}::{i & 0xFFFF:x}"
+
+
+def eero_devices(count: int, seed: int = 0, ipv6_ratio: float = 0.4) -> list[dict]:
+    rng = random.Random(seed)
+    devices = []
+    for i in range(count):
+        ips = [ipv4_address(i)]
+        if rng.random() < ipv6_ratio:
+            ips.extend(ipv6_address(i, rng) for _ in range(rng.randint(1, 3)))
+        devices.append(
+            {
+                "mac": mac_address(i),
+                "ips": ips,
+                "nickname": f"device-{i}",
+                "device_type": rng.choice(DEVICE_TYPES),
+            }
+        )
+    return devices
+
+
+def eero_network_devices(count: int) -> list[dict]:
+    return [
+        {
+            "mac_address": mac_address(0xFFFF0000 + i),
+            "ip_address": f"192.168.4.{i + 1}",
+            "model": "eero Pro 6",
+            "location": f"Room {i}",
+            "gateway": i == 0,
+            "ipv6_addresses": [{"address": f"2001:db8:ffff::{i + 1:x}"}],
+        }
+        for i in range(count)
+    ]
+
+
+def adguard_clients(
+    devices: list[dict],
+    seed: int = 0,
+    overlap: float = 0.9,
+    changed: float = 0.05,
+    extra: float = 0.05,
+) -> dict:
+    rng = random.Random(seed + 1)
+    clients = []
+    for device in devices:
+        if rng.random() >= overlap:
+            continue
+        name = device["nickname"]
+        if rng.random() < changed:
+            name += "-old"
+        ids = [device["mac"].upper().replace(":", "-"), *device["ips"]]
+        clients.append(adguard_client(ids, name, CLIENT_TAG_MAP[device["device_type"]]))
+    for i in range(int(len(devices) * extra)):
+        index = len(devices) + i
+        ids = [mac_address(index).upper().replace(":", "-"), ipv4_address(index)]
+        clients.append(adguard_client(ids, f"stale-{i}", "device_other"))
+    return {"clients": clients, "auto_clients": [], "supported_tags": []}
+
+
+def adguard_client(ids: list[str], name: str, tag: str) -> dict:
+    return {
+        "ids": ids,
+        "name": name,
+        "tags": [tag],
+        "use_global_settings": True,
+        "use_global_blocked_services": True,
+        "filtering_enabled": False,
+        "parental_enabled": False,
+        "safebrowsing_enabled": False,
+        "safesearch_enabled": False,
+        "blocked_services": [],
+        "upstreams": [],
+    }
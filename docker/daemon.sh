@@ -0,0 +1,27 @@
+#!/bin/sh
+
+# EAG_SYNC_FLAGS is shared with sync.sh, only pass on the flags the daemon has
+daemon_flags=""
+flags="$EAG_SYNC_FLAGS"
+while [ -n "$flags" ]; do
+  rest="${flags#?}"
+  flag="${flags%"$rest"}"
+  flags="$rest"
+  case "$flag" in
+    d|o) daemon_flags="$daemon_flags$flag" ;;
+    # The daemon never asks for confirmation
+    y) ;;
+    *)
+      echo "EAG_SYNC_FLAGS: unsupported daemon flag '$flag', expected d or o" >&2
+      exit 1
+      ;;
+  esac
+done
+
+exec eag-sync daemon \
+  --eero-cookie "$EAG_EERO_COOKIE" \
+  --adguard-host "$EAG_ADGUARD_HOST" \
+  --adguard-user "$EAG_ADGUARD_USER" \
+  --adguard-password "$EAG_ADGUARD_PASS" \
+  --cron "${EAG_CRON_SCHEDULE:-0 0 * * *}" \
+  ${daemon_flags:+"-$daemon_flags"}
@@ -1,7 +1,15 @@
-from pkg_resources import get_distribution, DistributionNotFound
+from typing import Any
 
 
-try:
-    VERSION = get_distribution("eero-adguard-sync").version
-except DistributionNotFound:
-    VERSION = "__missing__"
+def __getattr__(name: str) -> Any:
+    # Reading package metadata is slow, only do it when the version is asked for
+    if name != "VERSION":
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    from importlib.metadata import version, PackageNotFoundError
+
+    global VERSION
+    try:
+        VERSION = version("eero-adguard-sync")
+    except PackageNotFoundError:
+        VERSION = "__missing__"
+    return VERSION
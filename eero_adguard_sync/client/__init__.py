@@ -1,2 +1,3 @@
 from .eero import EeroClient
-from .adguard import AdGuardClient
+from .adguard import AdGuardClient, AdGuardResponseError
+from .async_adguard import AsyncAdGuardClient
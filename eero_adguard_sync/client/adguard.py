@@ -1,10 +1,25 @@
+import hashlib
+import json
+import threading
 from dataclasses import asdict
+from functools import partial
+from typing import Callable, Iterable, Iterator, Optional
 from urllib.parse import urlparse
 
-from eero_adguard_sync.utils import BaseURLSession
+import requests
+from requests.cookies import remove_cookie_by_name
+
+from eero_adguard_sync.utils import AIMDController, BaseURLSession, JSONStream, metrics
 from eero_adguard_sync.models import AdGuardClientDevice, AdGuardCredentialSet
 
 
+class AdGuardResponseError(Exception):
+    def __init__(self, status: int, text: str):
+        super().__init__(f"AdGuard responded with status {status}: {text}")
+        self.status = status
+        self.text = text
+
+
 class AdGuardClient:
     model_fields = {
         "ids",
@@ -13,18 +28,54 @@ class AdGuardClient:
         "use_global_settings",
         "use_global_blocked_services",
     }
+    reauth_status_codes = {401, 403}
+    session_cookie_name = "agh_session"
+    # Per-client settings a freshly added client starts with
+    default_settings = {
+        "use_global_settings": True,
+        "use_global_blocked_services": True,
+        "upstreams": [],
+        "ignore_querylog": False,
+        "ignore_statistics": False,
+    }
+    connect_timeout = 5
+    # Identifiers per control/clients/find request, kept well under URL limits
+    find_batch_size = 32
+    # Lookups only pay off well below the size of the full client list, a
+    # request's round trip is counted as this many bytes of transfer
+    find_size_ratio = 0.5
+    find_request_cost = 16 * 1024
+    find_result_fields = {"disallowed", "disallowed_rule", "whois_info"}
+    stream_chunk_size = 64 * 1024
 
     def __init__(
         self,
         server_ip: str,
         auto_auth: bool = False,
         credentials: AdGuardCredentialSet = None,
+        pool_size: int = 10,
+        timeout: float = 30,
+        retries: int = 3,
+        max_write_rate: float = None,
+        target_latency: float = 2,
     ):
-        if not server_ip.endswith("/"):
-            server_ip += "/"
-        server_url = urlparse(server_ip, "http").geturl().replace("///", "//")
-        self.session = BaseURLSession(server_url)
+        self.session = BaseURLSession(
+            self.server_url(server_ip),
+            timeout=(min(timeout, self.connect_timeout), timeout),
+            retries=retries,
+            pool_size=pool_size,
+        )
+        self.session.timing_hooks.append(partial(metrics.observe_request, "adguard"))
+        self.write_controller = AIMDController(
+            pool_size, max_write_rate, target_latency
+        )
         self.__logged_in = False
+        self.__credentials = None
+        self.__auth_lock = threading.Lock()
+        self.login_hooks: list[Callable[[str], None]] = []
+        self.state_version = None
+        self.clients_size: Optional[int] = None
+        self.clients_count: Optional[int] = None
         if auto_auth:
             if not isinstance(credentials, AdGuardCredentialSet):
                 raise ValueError(
@@ -32,51 +83,237 @@ class AdGuardClient:
                 )
             self.authenticate(credentials)
 
+    @staticmethod
+    def server_url(server_ip: str) -> str:
+        if not server_ip.endswith("/"):
+            server_ip += "/"
+        return urlparse(server_ip, "http").geturl().replace("///", "//")
+
+    @property
+    def base_url(self) -> str:
+        return self.session.base_url
+
     @property
     def is_authenticated(self) -> bool:
         return self.__logged_in
 
+    @property
+    def session_cookie(self) -> Optional[str]:
+        return self.session.cookies.get(self.session_cookie_name)
+
     def authenticate(self, credentials: AdGuardCredentialSet):
-        resp = self.session.post("control/login", json=asdict(credentials))
+        # A rejected restored cookie would otherwise sit next to the new one
+        remove_cookie_by_name(self.session.cookies, self.session_cookie_name)
+        with metrics.phase("adguard_auth"):
+            resp = self.session.post("control/login", json=asdict(credentials))
         resp.raise_for_status()
         self.__logged_in = True
+        self.__credentials = credentials
+        for hook in self.login_hooks:
+            hook(self.session_cookie)
 
-    def get_clients(self) -> list[AdGuardClientDevice]:
-        resp = self.session.get("control/clients")
+    def restore_session(self, credentials: AdGuardCredentialSet, cookie: str):
+        # Not checked here, the first request logs in again if it was rejected
+        self.session.cookies.set(self.session_cookie_name, cookie)
+        self.__logged_in = True
+        self.__credentials = credentials
+
+    def close(self):
+        self.session.close()
+
+    def __reauthenticate(self, rejected_cookie: Optional[str]):
+        with self.__auth_lock:
+            # Workers rejected together only log in once
+            if self.session_cookie != rejected_cookie:
+                return
+            self.__logged_in = False
+            self.authenticate(self.__credentials)
+
+    def __request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        cookie = self.session_cookie
+        resp = self.session.request(method, endpoint, **kwargs)
+        if resp.status_code in self.reauth_status_codes and self.__credentials:
+            # Streamed responses hold their connection until closed
+            resp.close()
+            self.__reauthenticate(cookie)
+            resp = self.session.request(method, endpoint, **kwargs)
         resp.raise_for_status()
-        data = resp.json()
-        clients: list[AdGuardClientDevice] = []
-        client_list = data["clients"]
-        if not client_list:
-            return []
-        for client in client_list:
-            new_client = {}
-            for key in self.model_fields:
-                new_client[key] = client[key]
-            clients.append(AdGuardClientDevice(**new_client, params=client))
+        return resp
+
+    @classmethod
+    def client_device(cls, client: dict) -> AdGuardClientDevice:
+        return AdGuardClientDevice(
+            **{key: client[key] for key in cls.model_fields},
+            params=None,
+            raw_params=json.dumps(client, sort_keys=True),
+        )
+
+    @classmethod
+    def parse_clients(cls, data: dict) -> list[AdGuardClientDevice]:
+        return [cls.client_device(client) for client in data["clients"] or []]
+
+    @classmethod
+    def iter_clients(cls, chunks: Iterable[bytes]) -> Iterator[AdGuardClientDevice]:
+        # Only one client's parsed dict is alive at a time
+        for client in JSONStream(chunks).iter_array("clients"):
+            yield cls.client_device(client)
+
+    @staticmethod
+    def add_payload(device: AdGuardClientDevice) -> dict:
+        payload = asdict(device)
+        payload.pop("params")
+        payload.pop("raw_params")
+        return payload
+
+    @staticmethod
+    def remove_payload(device_name: str) -> dict:
+        return {"name": device_name}
+
+    @staticmethod
+    def update_payload(device_name: str, device: AdGuardClientDevice) -> dict:
+        new_data = device.update_dict
+        old_data = new_data.pop("params")
+        return {"name": device_name, "data": {**old_data, **new_data}}
+
+    @classmethod
+    def replace_payload(cls, device_name: str, device: AdGuardClientDevice) -> dict:
+        return {"name": device_name, "data": cls.add_payload(device)}
+
+    @classmethod
+    def has_custom_settings(cls, params: dict) -> bool:
+        for key, default in cls.default_settings.items():
+            value = params.get(key, default)
+            if value != default and not (value is None and not default):
+                return True
+        return False
+
+    @staticmethod
+    def clients_version(clients: list[AdGuardClientDevice]) -> str:
+        # Same digest as dumping the sorted raw client list in one go
+        digest = hashlib.sha256(b"[")
+        ordered = sorted(clients, key=lambda i: i.name)
+        for i, client in enumerate(ordered):
+            if i:
+                digest.update(b", ")
+            digest.update(client.raw_params.encode("utf-8"))
+        digest.update(b"]")
+        return digest.hexdigest()
+
+    def get_clients(self) -> list[AdGuardClientDevice]:
+        resp = self.__request("GET", "control/clients", stream=True)
+        size = 0
+
+        def chunks() -> Iterator[bytes]:
+            nonlocal size
+            for chunk in resp.iter_content(self.stream_chunk_size):
+                size += len(chunk)
+                yield chunk
+
+        try:
+            clients = list(self.iter_clients(chunks()))
+        finally:
+            resp.close()
+        self.state_version = self.clients_version(clients)
+        self.clients_size = size
+        self.clients_count = len(clients)
         return clients
 
+    @classmethod
+    def find_pays_off(
+        cls,
+        identifier_count: int,
+        clients_size: Optional[int],
+        clients_count: Optional[int],
+    ) -> bool:
+        if not clients_size or not clients_count:
+            return False
+        requests = -(-identifier_count // cls.find_batch_size)
+        estimate = (
+            identifier_count * clients_size / clients_count
+            + requests * cls.find_request_cost
+        )
+        return estimate < clients_size * cls.find_size_ratio
+
+    def prefers_find(self, identifier_count: int) -> bool:
+        return self.find_pays_off(
+            identifier_count, self.clients_size, self.clients_count
+        )
+
+    @staticmethod
+    def find_params(batch: list[str]) -> dict[str, str]:
+        return {f"ip{i}": identifier for i, identifier in enumerate(batch)}
+
+    @classmethod
+    def parse_found_clients(cls, data: list[dict]) -> list[AdGuardClientDevice]:
+        clients = {}
+        for result in data:
+            for client in result.values():
+                # Runtime clients come back too, with WHOIS info or no name at all
+                if not client.get("name") or "whois_info" in client:
+                    continue
+                clients.setdefault(
+                    client["name"],
+                    {
+                        k: v
+                        for k, v in client.items()
+                        if k not in cls.find_result_fields
+                    },
+                )
+        return cls.parse_clients({"clients": list(clients.values())})
+
+    def find_clients(self, identifiers: list[str]) -> list[AdGuardClientDevice]:
+        identifiers = list(dict.fromkeys(identifiers))
+        found = []
+        for start in range(0, len(identifiers), self.find_batch_size):
+            batch = identifiers[start : start + self.find_batch_size]
+            resp = self.__request(
+                "GET",
+                "control/clients/find",
+                params=self.find_params(batch),
+            )
+            found.extend(resp.json())
+        return self.parse_found_clients(found)
+
     def __perform_client_action(self, endpoint: str, payload: dict) -> dict:
-        resp = self.session.post(endpoint, json=payload)
-        resp.raise_for_status()
+        # Every write makes AdGuard save its config, slow hosts get fewer in flight
+        start = self.write_controller.acquire()
+        congested = True
+        try:
+            # Not idempotent, a replayed update or delete can hit a client that
+            # took over the name, so only writes that never connected are retried
+            self.__request("POST", endpoint, json=payload)
+            congested = False
+        except requests.HTTPError as e:
+            congested = e.response.status_code >= 500
+            raise
+        finally:
+            self.write_controller.release(start, congested)
         return payload
 
-    def add_client_device(self, device: AdGuardClientDevice) -> dict:
-        payload = asdict(device)
-        payload.pop("params")
+    def add_client_payload(self, payload: dict) -> dict:
         return self.__perform_client_action("control/clients/add", payload)
 
-    def remove_client_device(self, device_name: str) -> dict:
-        payload = {"name": device_name}
+    def remove_client_payload(self, payload: dict) -> dict:
         return self.__perform_client_action("control/clients/delete", payload)
 
+    def update_client_payload(self, payload: dict) -> dict:
+        return self.__perform_client_action("control/clients/update", payload)
+
+    def add_client_device(self, device: AdGuardClientDevice) -> dict:
+        return self.add_client_payload(self.add_payload(device))
+
+    def remove_client_device(self, device_name: str) -> dict:
+        return self.remove_client_payload(self.remove_payload(device_name))
+
     def update_client_device(
         self, device_name: str, device: AdGuardClientDevice
     ) -> dict:
-        new_data = device.update_dict
-        old_data = new_data.pop("params")
-        payload = {"name": device_name, "data": {**old_data, **new_data}}
-        return self.__perform_client_action("control/clients/update", payload)
+        return self.update_client_payload(self.update_payload(device_name, device))
+
+    def replace_client_device(
+        self, device_name: str, device: AdGuardClientDevice
+    ) -> dict:
+        return self.update_client_payload(self.replace_payload(device_name, device))
 
     def clear_clients(self):
         clients = self.get_clients()
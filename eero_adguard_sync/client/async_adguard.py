@@ -0,0 +1,278 @@
+import json
+import time
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Callable, Optional
+from urllib.parse import urljoin
+
+from eero_adguard_sync.client.adguard import AdGuardClient, AdGuardResponseError
+from eero_adguard_sync.models import AdGuardClientDevice, AdGuardCredentialSet
+from eero_adguard_sync.utils import (
+    AIMDController,
+    IDEMPOTENT_METHODS,
+    RETRY_STATUS_CODES,
+    backoff_time,
+    metrics,
+)
+
+if TYPE_CHECKING:
+    import asyncio
+
+    import aiohttp
+
+
+class AsyncAdGuardClient:
+    def __init__(
+        self,
+        server_ip: str,
+        pool_size: int = 10,
+        keepalive_timeout: float = 30,
+        timeout: float = 30,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 10,
+        max_write_rate: float = None,
+        target_latency: float = 2,
+    ):
+        # aiohttp takes a noticeable share of startup time, only load it when used
+        import aiohttp
+
+        self.base_url = AdGuardClient.server_url(server_ip)
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=min(timeout, AdGuardClient.connect_timeout),
+            sock_read=timeout,
+        )
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.write_controller = AIMDController(
+            pool_size, max_write_rate, target_latency
+        )
+        self.__session: Optional["aiohttp.ClientSession"] = None
+        self.__logged_in = False
+        self.__credentials = None
+        self.__restored_cookie: Optional[str] = None
+        self.__auth_lock: Optional["asyncio.Lock"] = None
+        self.login_hooks: list[Callable[[str], None]] = []
+        self.state_version = None
+        self.clients_size: Optional[int] = None
+        self.clients_count: Optional[int] = None
+
+    async def __aenter__(self) -> "AsyncAdGuardClient":
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    @property
+    def is_authenticated(self) -> bool:
+        return self.__logged_in
+
+    @property
+    def session(self) -> "aiohttp.ClientSession":
+        import aiohttp
+
+        if self.__session is None or self.__session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size, keepalive_timeout=self.keepalive_timeout
+            )
+            # AdGuard is usually addressed by IP, which the default jar rejects
+            cookie_jar = aiohttp.CookieJar(unsafe=True)
+            if self.__restored_cookie is not None:
+                from yarl import URL
+
+                cookie_jar.update_cookies(
+                    {AdGuardClient.session_cookie_name: self.__restored_cookie},
+                    URL(self.base_url),
+                )
+            self.__session = aiohttp.ClientSession(
+                connector=connector, cookie_jar=cookie_jar, timeout=self.timeout
+            )
+        return self.__session
+
+    async def close(self):
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    @property
+    def session_cookie(self) -> Optional[str]:
+        from yarl import URL
+
+        cookies = self.session.cookie_jar.filter_cookies(URL(self.base_url))
+        cookie = cookies.get(AdGuardClient.session_cookie_name)
+        return cookie.value if cookie is not None else None
+
+    @staticmethod
+    def __is_connect_error(error: Exception) -> bool:
+        import aiohttp
+
+        # Only in aiohttp 3.10+, older versions can't tell connect from read timeouts
+        connect_timeout = getattr(aiohttp, "ConnectionTimeoutError", ())
+        return isinstance(error, (aiohttp.ClientConnectorError, connect_timeout))
+
+    async def __send(
+        self, method: str, endpoint: str, idempotent: bool = None, **kwargs
+    ) -> bytes:
+        import asyncio
+        import aiohttp
+
+        url = urljoin(self.base_url, endpoint)
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            status = None
+            try:
+                async with self.session.request(method, url, **kwargs) as resp:
+                    body = await resp.read()
+                    status = resp.status
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                # Requests that never connected can't have reached the server
+                retryable = idempotent or self.__is_connect_error(e)
+                if not retryable or attempt >= self.retries:
+                    raise
+                delay = backoff_time(attempt, self.backoff, self.max_backoff)
+            else:
+                if (
+                    not idempotent
+                    or status not in RETRY_STATUS_CODES
+                    or attempt >= self.retries
+                ):
+                    break
+                delay = backoff_time(
+                    attempt,
+                    self.backoff,
+                    self.max_backoff,
+                    resp.headers.get("Retry-After", ""),
+                )
+            finally:
+                metrics.observe_request(
+                    "adguard", method, url, status, time.perf_counter() - start
+                )
+            await asyncio.sleep(delay)
+            attempt += 1
+        if status >= 400:
+            raise AdGuardResponseError(
+                status, body.decode(resp.get_encoding(), "replace")
+            )
+        return body
+
+    async def __reauthenticate(self, rejected_cookie: Optional[str]):
+        import asyncio
+
+        if self.__auth_lock is None:
+            self.__auth_lock = asyncio.Lock()
+        async with self.__auth_lock:
+            # Requests rejected together only log in once
+            if self.session_cookie != rejected_cookie:
+                return
+            self.__logged_in = False
+            await self.authenticate(self.__credentials)
+
+    async def __request(self, method: str, endpoint: str, **kwargs) -> bytes:
+        cookie = self.session_cookie
+        try:
+            return await self.__send(method, endpoint, **kwargs)
+        except AdGuardResponseError as e:
+            reauth = e.status in AdGuardClient.reauth_status_codes
+            if not reauth or not self.__credentials:
+                raise
+        await self.__reauthenticate(cookie)
+        return await self.__send(method, endpoint, **kwargs)
+
+    async def authenticate(self, credentials: AdGuardCredentialSet):
+        with metrics.phase("adguard_auth"):
+            await self.__send("POST", "control/login", json=asdict(credentials))
+        self.__logged_in = True
+        self.__credentials = credentials
+        for hook in self.login_hooks:
+            hook(self.session_cookie)
+
+    def restore_session(self, credentials: AdGuardCredentialSet, cookie: str):
+        # aiohttp sessions belong to a running loop, the cookie waits for the first one
+        self.__restored_cookie = cookie
+        self.__logged_in = True
+        self.__credentials = credentials
+
+    async def get_clients(self) -> list[AdGuardClientDevice]:
+        body = await self.__request("GET", "control/clients")
+        view, chunk_size = memoryview(body), AdGuardClient.stream_chunk_size
+        # The body is already in memory, but the parsed tree never is as a whole
+        clients = list(
+            AdGuardClient.iter_clients(
+                view[i : i + chunk_size] for i in range(0, len(body), chunk_size)
+            )
+        )
+        self.state_version = AdGuardClient.clients_version(clients)
+        self.clients_size = len(body)
+        self.clients_count = len(clients)
+        return clients
+
+    def prefers_find(self, identifier_count: int) -> bool:
+        return AdGuardClient.find_pays_off(
+            identifier_count, self.clients_size, self.clients_count
+        )
+
+    async def find_clients(self, identifiers: list[str]) -> list[AdGuardClientDevice]:
+        identifiers = list(dict.fromkeys(identifiers))
+        found = []
+        for start in range(0, len(identifiers), AdGuardClient.find_batch_size):
+            batch = identifiers[start : start + AdGuardClient.find_batch_size]
+            body = await self.__request(
+                "GET", "control/clients/find", params=AdGuardClient.find_params(batch)
+            )
+            found.extend(json.loads(body))
+        return AdGuardClient.parse_found_clients(found)
+
+    async def __perform_client_action(self, endpoint: str, payload: dict) -> dict:
+        # Every write makes AdGuard save its config, slow hosts get fewer in flight
+        start = await self.write_controller.acquire_async()
+        congested = True
+        try:
+            await self.__request("POST", endpoint, json=payload)
+            congested = False
+        except AdGuardResponseError as e:
+            congested = e.status >= 500
+            raise
+        finally:
+            self.write_controller.release(start, congested)
+        return payload
+
+    async def add_client_payload(self, payload: dict) -> dict:
+        return await self.__perform_client_action("control/clients/add", payload)
+
+    async def remove_client_payload(self, payload: dict) -> dict:
+        return await self.__perform_client_action("control/clients/delete", payload)
+
+    async def update_client_payload(self, payload: dict) -> dict:
+        return await self.__perform_client_action("control/clients/update", payload)
+
+    async def add_client_device(self, device: AdGuardClientDevice) -> dict:
+        return await self.add_client_payload(AdGuardClient.add_payload(device))
+
+    async def remove_client_device(self, device_name: str) -> dict:
+        return await self.remove_client_payload(
+            AdGuardClient.remove_payload(device_name)
+        )
+
+    async def update_client_device(
+        self, device_name: str, device: AdGuardClientDevice
+    ) -> dict:
+        return await self.update_client_payload(
+            AdGuardClient.update_payload(device_name, device)
+        )
+
+    async def replace_client_device(
+        self, device_name: str, device: AdGuardClientDevice
+    ) -> dict:
+        return await self.update_client_payload(
+            AdGuardClient.replace_payload(device_name, device)
+        )
+
+    async def clear_clients(self):
+        clients = await self.get_clients()
+        for client in clients:
+            await self.remove_client_device(client.name)
@@ -1,8 +1,11 @@
 import os
+import time
+from typing import Callable
 
 import eero
+from eero.client import Client
 
-from eero_adguard_sync.utils import app_paths
+from eero_adguard_sync.utils import EERO_COOKIE_PATH, metrics
 from eero_adguard_sync.models import EeroClientDevice, EeroNetworkDevice
 
 
@@ -28,6 +31,33 @@ class CookieStore(eero.SessionStorage):
             f.write(self.__cookie)
 
 
+class TimedClient(Client):
+    def __timed(self, method: str, request: Callable, action: str, **kwargs):
+        start = time.perf_counter()
+        status = None
+        try:
+            data = request(action, **kwargs)
+            status = 200
+            return data
+        except eero.ClientException as e:
+            status = e.status
+            raise
+        finally:
+            metrics.observe_request(
+                "eero",
+                method,
+                self.API_ENDPOINT.format(action),
+                status,
+                time.perf_counter() - start,
+            )
+
+    def post(self, action: str, **kwargs):
+        return self.__timed("POST", super().post, action, **kwargs)
+
+    def get(self, action: str, **kwargs):
+        return self.__timed("GET", super().get, action, **kwargs)
+
+
 class EeroClient(eero.Eero):
     device_model_fields = {"ips", "mac", "nickname", "device_type"}
     eero_model_fields = {
@@ -38,13 +68,28 @@ class EeroClient(eero.Eero):
         "gateway",
         "ipv6_addresses",
     }
-    cookie_path = os.path.join(app_paths.app_data_path, "session.cookie")
+    cookie_path = EERO_COOKIE_PATH
 
     def __init__(self, cookie: str = None):
         session = CookieStore(self.cookie_path)
         if cookie:
             session.cookie = cookie
         super().__init__(session)
+        self.client = TimedClient()
+        self.login_hooks: list[Callable[[str], None]] = []
+
+    def __run_login_hooks(self):
+        for hook in self.login_hooks:
+            hook(self.session.cookie)
+
+    def login_verify(self, verification_code, user_token):
+        response = super().login_verify(verification_code, user_token)
+        self.__run_login_hooks()
+        return response
+
+    def login_refresh(self):
+        super().login_refresh()
+        self.__run_login_hooks()
 
     @classmethod
     def clear_credentials(cls):
@@ -53,7 +98,7 @@ class EeroClient(eero.Eero):
         except FileNotFoundError:
             pass
 
-    def get_clients(self, network: str) -> list[EeroClientDevice]:
+    def get_devices(self, network: str) -> list[EeroClientDevice]:
         devices: list[EeroClientDevice] = []
         for device in self.devices(network):
             new_device = {}
@@ -61,9 +106,16 @@ class EeroClient(eero.Eero):
                 new_device[key] = device[key]
             if new_device["nickname"]:
                 devices.append(EeroClientDevice(**new_device))
+        return devices
+
+    def get_eeros(self, network: str) -> list[EeroClientDevice]:
+        devices: list[EeroClientDevice] = []
         for device in self.eeros(network):
             new_device = {}
             for key in self.eero_model_fields:
                 new_device[key] = device[key]
             devices.append(EeroNetworkDevice(**new_device).as_client_device())
         return devices
+
+    def get_clients(self, network: str) -> list[EeroClientDevice]:
+        return self.get_devices(network) + self.get_eeros(network)
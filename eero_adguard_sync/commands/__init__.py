@@ -1,2 +0,0 @@
-from .sync import sync
-from .clear import clear
@@ -1,6 +1,8 @@
+import os
+
 import click
 
-from eero_adguard_sync.client import EeroClient
+from eero_adguard_sync.utils import EERO_COOKIE_PATH, SessionCache
 
 
 @click.command()
@@ -14,5 +16,10 @@ from eero_adguard_sync.client import EeroClient
 def clear(confirm: bool = False):
     if not confirm:
         click.confirm("Delete all locally cached credentials?", abort=True)
-    EeroClient.clear_credentials()
+    # Not through EeroClient, importing it pulls in requests and eero
+    try:
+        os.remove(EERO_COOKIE_PATH.path)
+    except FileNotFoundError:
+        pass
+    SessionCache(SessionCache.default_path).clear()
     click.echo("All locally cached credentials deleted")
@@ -0,0 +1,266 @@
+import signal
+import threading
+from datetime import datetime
+from typing import Callable, Union
+from timeit import default_timer as timer
+
+import click
+
+from eero_adguard_sync.commands.sync import (
+    adguard_options,
+    authenticate_eero,
+    authenticate_adguard,
+    conflict_option,
+    create_executor,
+    delete_option,
+    eero_options,
+    metrics_file_option,
+    network_option,
+    overwrite_option,
+    prompt_adguard_credentials,
+    request_options,
+)
+from eero_adguard_sync.models import DHCPClientTable
+from eero_adguard_sync.sync import EeroAdGuardSyncHandler, select_networks
+from eero_adguard_sync.utils import (
+    AdaptiveSchedule,
+    CronSchedule,
+    FetchCache,
+    FingerprintStore,
+    IntervalSchedule,
+    MetricsServer,
+    OperationJournal,
+    SessionCache,
+    metrics,
+)
+
+
+def report_changes(previous: DHCPClientTable, current: DHCPClientTable):
+    diff = previous.compare(current)
+    click.echo(
+        f"Detected Eero changes: {len(diff.discovered)} new, "
+        f"{len(diff.changed)} changed, {len(diff.missing)} removed devices"
+    )
+
+
+def run_schedule(
+    handler: EeroAdGuardSyncHandler,
+    schedule: Union[IntervalSchedule, AdaptiveSchedule, CronSchedule],
+    stop: threading.Event,
+    record_run: Callable[[bool, float], None],
+    delete: bool = False,
+    overwrite: bool = False,
+    watch: bool = False,
+):
+    if watch:
+        click.echo(f"Starting daemon, polling Eero {schedule}")
+    else:
+        click.echo(f"Starting daemon, syncing {schedule}")
+    state = handler.journal.load()
+    # The journal is shared with the sync command, it may be for another host
+    if state is not None and state.header["host"] == handler.adguard_client.base_url:
+        start = timer()
+        try:
+            handler.resume(state)
+        except Exception as e:
+            # The next sync diffs from scratch and replaces the journal
+            click.secho(f"Resume failed: {e}", fg="red")
+            record_run(False, timer() - start)
+        else:
+            elapsed = timer() - start
+            record_run(True, elapsed)
+            click.echo(f"Resume complete in {round(elapsed, 2)}s")
+    last_table = None
+    last_fingerprint = None
+    while not stop.is_set():
+        next_run = schedule.next_run(datetime.now())
+        if not watch:
+            click.echo(
+                f"Next sync at {next_run.isoformat(sep=' ', timespec='seconds')}"
+            )
+        if stop.wait(max((next_run - datetime.now()).total_seconds(), 0)):
+            break
+        if watch:
+            # The sync reuses the polled Eero devices instead of fetching them again
+            handler.fetch_cache = FetchCache()
+            try:
+                table = handler.poll()
+            except Exception as e:
+                click.secho(f"Poll failed: {e}", fg="red")
+                continue
+            fingerprint = table.fingerprint
+            if fingerprint == last_fingerprint:
+                schedule.record(False)
+                continue
+            if last_table is not None:
+                report_changes(last_table, table)
+        click.echo("Starting sync...")
+        start = timer()
+        try:
+            handler.sync(delete, overwrite, previous=last_table)
+        except Exception as e:
+            click.secho(f"Sync failed: {e}", fg="red")
+            record_run(False, timer() - start)
+            # Retry with a full fetch in case the lookups missed a conflict
+            last_table = None
+            continue
+        elapsed = timer() - start
+        record_run(True, elapsed)
+        click.echo(f"Sync complete in {round(elapsed, 2)}s")
+        if watch:
+            last_table = table
+            last_fingerprint = fingerprint
+            schedule.record(True)
+
+
+@click.command()
+@adguard_options()
+@eero_options
+@network_option
+@click.option(
+    "--interval",
+    type=click.IntRange(min=1),
+    default=3600,
+    show_default=True,
+    help="Seconds between syncs, or the longest poll interval with --watch, ignored when --cron is set",
+)
+@click.option(
+    "--cron",
+    type=str,
+    help="Sync schedule in cron syntax, e.g. '*/5 * * * *'",
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    default=False,
+    help="Poll Eero for device changes and only sync when they change",
+)
+@click.option(
+    "--min-interval",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="Shortest poll interval in seconds with --watch, used right after a change",
+)
+@click.option(
+    "--jitter",
+    type=click.FloatRange(min=0),
+    default=0,
+    show_default=True,
+    help="Maximum random delay in seconds added to each scheduled sync",
+)
+@delete_option
+@overwrite_option
+@request_options
+@conflict_option
+@click.option(
+    "--metrics-port",
+    type=click.IntRange(min=0, max=65535),
+    help="Serve Prometheus metrics over HTTP on this port",
+)
+@metrics_file_option
+def daemon(
+    adguard_host: str = None,
+    adguard_user: str = None,
+    adguard_password: str = None,
+    eero_user: str = None,
+    eero_cookie: str = None,
+    network: tuple[str] = (),
+    interval: int = 3600,
+    cron: str = None,
+    watch: bool = False,
+    min_interval: int = 10,
+    jitter: float = 0,
+    delete: bool = False,
+    overwrite: bool = False,
+    concurrency: int = 1,
+    safe: bool = False,
+    timeout: float = 30,
+    retries: int = 3,
+    max_rate: float = None,
+    target_latency: float = 2,
+    on_conflict: str = "skip",
+    metrics_port: int = None,
+    metrics_file: str = None,
+    *args,
+    **kwargs,
+):
+    if watch and cron:
+        raise click.BadParameter(
+            "Cannot be combined with --watch", param_hint="'--cron'"
+        )
+    try:
+        if watch:
+            schedule = AdaptiveSchedule(min_interval, interval, jitter=jitter)
+        elif cron:
+            schedule = CronSchedule(cron, jitter)
+        else:
+            schedule = IntervalSchedule(interval, jitter)
+    except ValueError as e:
+        param_hint = "'--min-interval'" if watch else "'--cron'"
+        raise click.BadParameter(str(e), param_hint=param_hint)
+
+    if overwrite:
+        delete = False
+
+    eero_client = authenticate_eero(eero_cookie, eero_user)
+    session_cache = SessionCache(SessionCache.default_path)
+    networks = select_networks(eero_client, network, session_cache)
+    adguard_host, adguard_creds = prompt_adguard_credentials(
+        adguard_host, adguard_user, adguard_password
+    )
+    executor = authenticate_adguard(
+        create_executor(
+            adguard_host,
+            concurrency,
+            safe,
+            timeout=timeout,
+            retries=retries,
+            max_write_rate=max_rate,
+            target_latency=target_latency,
+        ),
+        adguard_host,
+        adguard_creds,
+        session_cache,
+    )
+    handler = EeroAdGuardSyncHandler(
+        eero_client,
+        executor,
+        FingerprintStore(FingerprintStore.default_path),
+        rename_conflicts=on_conflict == "rename",
+        networks=networks,
+        journal=OperationJournal(OperationJournal.default_path),
+    )
+
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        click.echo(f"Received {signal.Signals(signum).name}, shutting down...")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    def record_run(success: bool, elapsed: float):
+        metrics.record_run(success, elapsed)
+        if metrics_file:
+            try:
+                metrics.write(metrics_file)
+            except OSError as e:
+                click.secho(f"Failed to write metrics: {e}", fg="red")
+
+    metrics_server = None
+    with executor:
+        try:
+            if metrics_port is not None:
+                metrics_server = MetricsServer(metrics, port=metrics_port)
+                try:
+                    metrics_server.start()
+                except OSError as e:
+                    raise click.BadParameter(str(e), param_hint="'--metrics-port'")
+                click.echo(f"Serving metrics on port {metrics_server.port}")
+            run_schedule(handler, schedule, stop, record_run, delete, overwrite, watch)
+        finally:
+            if metrics_server is not None:
+                metrics_server.stop()
+    click.echo("Daemon stopped")
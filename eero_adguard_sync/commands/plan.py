@@ -0,0 +1,154 @@
+from timeit import default_timer as timer
+
+import click
+
+from eero_adguard_sync.commands.sync import (
+    adguard_options,
+    authenticate_eero,
+    authenticate_adguard,
+    conflict_option,
+    create_executor,
+    delete_option,
+    eero_options,
+    full_option,
+    network_option,
+    prompt_adguard_credentials,
+    request_options,
+)
+from eero_adguard_sync.models import AdGuardSyncPlan
+from eero_adguard_sync.sync import EeroAdGuardSyncHandler, select_networks
+from eero_adguard_sync.utils import FingerprintStore, SessionCache
+
+
+@click.command()
+@click.argument(
+    "plan_file",
+    type=click.Path(dir_okay=False, writable=True),
+)
+@adguard_options()
+@eero_options
+@network_option
+@delete_option
+@full_option
+@conflict_option
+def plan(
+    plan_file: str,
+    adguard_host: str = None,
+    adguard_user: str = None,
+    adguard_password: str = None,
+    eero_user: str = None,
+    eero_cookie: str = None,
+    network: tuple[str] = (),
+    delete: bool = False,
+    full: bool = False,
+    on_conflict: str = "skip",
+    *args,
+    **kwargs,
+):
+    eero_client = authenticate_eero(eero_cookie, eero_user)
+    session_cache = SessionCache(SessionCache.default_path)
+    networks = select_networks(eero_client, network, session_cache)
+    adguard_host, adguard_creds = prompt_adguard_credentials(
+        adguard_host, adguard_user, adguard_password
+    )
+    executor = authenticate_adguard(
+        create_executor(adguard_host), adguard_host, adguard_creds, session_cache
+    )
+    handler = EeroAdGuardSyncHandler(
+        eero_client,
+        executor,
+        fingerprint_store=FingerprintStore(FingerprintStore.default_path),
+        full=full,
+        rename_conflicts=on_conflict == "rename",
+        networks=networks,
+    )
+    click.echo("Computing plan...")
+    with executor:
+        sync_plan = handler.plan(delete)
+    for action in sync_plan.add:
+        click.secho(f"+ '{action.nickname}' [{action.mac_address}]", fg="green")
+    for action in sync_plan.update:
+        click.secho(f"~ '{action.nickname}' [{action.mac_address}]", fg="yellow")
+    for action in sync_plan.delete:
+        click.secho(f"- '{action.nickname}' [{action.mac_address}]", fg="red")
+    click.echo(
+        f"Plan: {len(sync_plan.add)} to add, {len(sync_plan.update)} to update, "
+        f"{len(sync_plan.delete)} to delete"
+    )
+    sync_plan.save(plan_file)
+    click.echo(f"Plan saved to {plan_file}, run 'eag-sync apply {plan_file}' to apply")
+
+
+@click.command()
+@click.argument(
+    "plan_file",
+    type=click.Path(exists=True, dir_okay=False),
+)
+@adguard_options(
+    "AdGuard Home host IP address, defaults to the host the plan was made for"
+)
+@click.option(
+    "--confirm",
+    "-y",
+    is_flag=True,
+    default=False,
+    help="Skip interactive confirmation",
+)
+@request_options
+def apply(
+    plan_file: str,
+    adguard_host: str = None,
+    adguard_user: str = None,
+    adguard_password: str = None,
+    confirm: bool = False,
+    concurrency: int = 1,
+    safe: bool = False,
+    timeout: float = 30,
+    retries: int = 3,
+    max_rate: float = None,
+    target_latency: float = 2,
+    *args,
+    **kwargs,
+):
+    try:
+        sync_plan = AdGuardSyncPlan.load(plan_file)
+    except (ValueError, TypeError, KeyError) as e:
+        raise click.BadParameter(str(e), param_hint="'PLAN_FILE'")
+    if sync_plan.is_empty:
+        click.echo("Plan has no changes, nothing to apply")
+        return
+    adguard_host, adguard_creds = prompt_adguard_credentials(
+        adguard_host or sync_plan.adguard_host, adguard_user, adguard_password
+    )
+    executor = authenticate_adguard(
+        create_executor(
+            adguard_host,
+            concurrency,
+            safe,
+            timeout=timeout,
+            retries=retries,
+            max_write_rate=max_rate,
+            target_latency=target_latency,
+        ),
+        adguard_host,
+        adguard_creds,
+        SessionCache(SessionCache.default_path),
+    )
+    handler = EeroAdGuardSyncHandler(
+        None,
+        executor,
+        FingerprintStore(FingerprintStore.default_path),
+        networks=sync_plan.networks,
+    )
+    with executor:
+        if not confirm:
+            click.confirm(
+                f"Apply plan from {sync_plan.created}: {len(sync_plan.add)} to add, "
+                f"{len(sync_plan.update)} to update, {len(sync_plan.delete)} to delete?",
+                abort=True,
+            )
+        click.echo("Applying plan...")
+        start = timer()
+        handler.apply(sync_plan)
+        elapsed = timer() - start
+    click.echo(f"Plan applied in {round(elapsed, 2)}s")
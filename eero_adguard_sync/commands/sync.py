@@ -1,195 +1,374 @@
-import click
-from requests import HTTPError
 from timeit import default_timer as timer
+from typing import Callable, Optional, Union
+
+import click
+
+from eero_adguard_sync.client import EeroClient, AdGuardClient, AsyncAdGuardClient
+from eero_adguard_sync.models import AdGuardCredentialSet
+from eero_adguard_sync.sync import (
+    AsyncExecutor,
+    EeroAdGuardSyncHandler,
+    RequestExecutor,
+    ThreadedExecutor,
+    find_network,
+    select_networks,
+)
+from eero_adguard_sync.utils import (
+    FetchCache,
+    FingerprintStore,
+    JournalState,
+    OperationJournal,
+    SessionCache,
+    SyncProfiler,
+    WorkerPool,
+    WorkerResult,
+    host_path,
+    metrics,
+)
+
+ADGUARD_SESSION_TTL = 7 * 24 * 60 * 60
+
+
+def shared_options(*options: Callable[[Callable], Callable]) -> Callable:
+    # Applied in reverse so --help lists them in the given order
+    def decorator(func: Callable) -> Callable:
+        for option in reversed(options):
+            func = option(func)
+        return func
+
+    return decorator
+
+
+def adguard_options(
+    host_help: str = "AdGuard Home host IP address", multiple: bool = False
+) -> Callable:
+    return shared_options(
+        click.option(
+            "--adguard-host",
+            help=host_help,
+            multiple=multiple,
+            type=str,
+        ),
+        click.option(
+            "--adguard-user",
+            help="AdGuard Home username",
+            type=str,
+        ),
+        click.option(
+            "--adguard-password",
+            help="AdGuard Home password",
+            type=str,
+        ),
+    )
+
+
+eero_options = shared_options(
+    click.option(
+        "--eero-user",
+        help="Eero email address or phone number",
+        type=str,
+    ),
+    click.option(
+        "--eero-cookie",
+        help="Eero session cookie",
+        type=str,
+    ),
+)
+
+network_option = click.option(
+    "--network",
+    "-n",
+    multiple=True,
+    help="Eero network name, URL or 'all' to sync, can be repeated",
+)
 
-from eero_adguard_sync.client import EeroClient, AdGuardClient
-from eero_adguard_sync.models import (
-    AdGuardCredentialSet,
-    AdGuardClientDevice,
-    DHCPClientTable,
-    DHCPClientTableDiff,
+delete_option = click.option(
+    "--delete",
+    "-d",
+    is_flag=True,
+    default=False,
+    help="Delete AdGuard clients not found in Eero DHCP list",
 )
 
+overwrite_option = click.option(
+    "--overwrite",
+    "-o",
+    is_flag=True,
+    default=False,
+    help="Make AdGuard match Eero exactly, deleting other clients and resetting client settings",
+)
 
-NETWORK_SELECT_PROMPT = """Multiple Eero networks found, please select by ID
-                
-{network_options}
+full_option = click.option(
+    "--full",
+    is_flag=True,
+    default=False,
+    help="Ignore stored fingerprints and reconcile every client",
+)
 
-Network ID"""
+request_options = shared_options(
+    click.option(
+        "--concurrency",
+        "-c",
+        type=click.IntRange(min=1),
+        default=1,
+        show_default=True,
+        help="Number of AdGuard requests to run in parallel",
+    ),
+    click.option(
+        "--safe",
+        is_flag=True,
+        default=False,
+        help="Serialize concurrent writes to the same AdGuard client name",
+    ),
+    click.option(
+        "--timeout",
+        type=click.FloatRange(min=0, min_open=True),
+        default=30,
+        show_default=True,
+        help="Seconds to wait for an AdGuard response before giving up",
+    ),
+    click.option(
+        "--retries",
+        type=click.IntRange(min=0),
+        default=3,
+        show_default=True,
+        help="Retries with backoff for failed AdGuard connections and idempotent requests",
+    ),
+    click.option(
+        "--max-rate",
+        type=click.FloatRange(min=0, min_open=True),
+        help="Maximum AdGuard writes per second, lowered automatically when AdGuard slows down",
+    ),
+    click.option(
+        "--target-latency",
+        type=click.FloatRange(min=0, min_open=True),
+        default=2,
+        show_default=True,
+        help="AdGuard write latency in seconds above which fewer writes are sent in parallel",
+    ),
+)
 
+conflict_option = click.option(
+    "--on-conflict",
+    type=click.Choice(["skip", "rename"]),
+    default="skip",
+    show_default=True,
+    help="Skip or rename Eero devices whose name or IP is already used by another client",
+)
 
-class EeroAdGuardSyncHandler:
-    def __init__(self, eero_client: EeroClient, adguard_client: AdGuardClient):
-        self.eero_client = eero_client
-        self.adguard_client = adguard_client
-        self.__network = self.__prompt_network()
+metrics_file_option = click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write run metrics to this file after each sync, as JSON if it ends in .json, otherwise in Prometheus text format",
+)
 
-    @property
-    def network(self) -> str:
-        return self.__network
 
-    def __prompt_network(self) -> str:
-        network_list = self.eero_client.account()["networks"]["data"]
-        network_count = len(network_list)
-        if not network_list:
-            raise click.ClickException("No Eero networks associated with this account")
-        network_idx = 0
-        if network_count > 1:
-            network_options = "\n".join(
-                [f"{i}: {network['name']}" for i, network in enumerate(network_list)]
+def parse_network_targets(
+    eero_client: EeroClient, networks: list[dict], network_targets: tuple[str] = ()
+) -> dict[str, str]:
+    targets = {}
+    for network_target in network_targets:
+        selector, _, host = network_target.rpartition("=")
+        if not selector or not host:
+            raise click.BadParameter(
+                f"Expected NETWORK=HOST, got '{network_target}'",
+                param_hint="'--network-target'",
             )
-            choice = click.Choice([str(i) for i in range(network_count)])
-            click.prompt(
-                NETWORK_SELECT_PROMPT.format(network_options=network_options),
-                type=choice,
-                default=str(network_idx),
-                show_choices=False,
+        network = find_network(eero_client, networks, selector)
+        if network is None:
+            raise click.BadParameter(
+                f"No selected Eero network matches '{selector}'",
+                param_hint="'--network-target'",
             )
-        network = network_list[network_idx]
-        click.echo(f"Selected network '{network['name']}'")
-        return network["url"]
-
-    def create(self, diff: DHCPClientTableDiff):
-        if not diff.discovered:
-            click.echo("No new clients found, skipped creation")
-            return
-        with click.progressbar(
-            diff.discovered, label="Add new clients", show_pos=True
-        ) as bar:
-            duplicate_devices = []
-            for eero_device in bar:
-                try:
-                    self.adguard_client.add_client_device(
-                        AdGuardClientDevice.from_dhcp_client(eero_device)
-                    )
-                except HTTPError as e:
-                    errors = [
-                        "client already exists",
-                        "another client uses the same id",
-                    ]
-                    if any(
-                        [
-                            True
-                            for error in errors
-                            if error.lower() in e.response.text.lower()
-                        ]
-                    ):
-                        duplicate_devices.append(
-                            f"'{eero_device.nickname}' [{eero_device.mac_address}]"
-                        )
-                    else:
-                        raise
-            if duplicate_devices:
-                for duplicate_device in duplicate_devices:
-                    click.secho(
-                        f"Skipped device, duplicate name in Eero network: {duplicate_device}",
-                        fg="red",
-                    )
-
-    def update(self, diff: DHCPClientTableDiff):
-        if not diff.associated:
-            click.echo("No existing clients found, skipped update")
-            return
-        with click.progressbar(
-            diff.associated, label="Update existing clients", show_pos=True
-        ) as bar:
-            for adguard_device, eero_device in bar:
-                new_device = AdGuardClientDevice.from_dhcp_client(eero_device)
-                new_device.params = adguard_device.instance.params
-                self.adguard_client.update_client_device(
-                    adguard_device.nickname, new_device
-                )
+        targets[network["url"]] = host
+    return targets
 
-    def delete(self, diff: DHCPClientTableDiff):
-        if not diff.missing:
-            click.echo("No removed clients found, skipped deletion")
-            return
-        with click.progressbar(
-            diff.missing, label="Delete removed clients", show_pos=True
-        ) as bar:
-            for device in bar:
-                self.adguard_client.remove_client_device(device.nickname)
-
-    def sync(self, delete: bool = False, overwrite: bool = False):
-        if overwrite:
-            self.adguard_client.clear_clients()
 
-        eero_clients = []
-        for client in self.eero_client.get_clients(self.__network):
-            try:
-                eero_clients.append(client.to_dhcp_client())
-            except ValueError:
-                click.secho(
-                    f"Eero device missing MAC address, skipped device named '{client.nickname}'",
-                    fg="red",
+def report_summary(
+    handlers: dict[str, EeroAdGuardSyncHandler],
+    results: list[WorkerResult],
+    timings: dict[str, float],
+):
+    click.echo("Summary:")
+    for result in results:
+        host = result.item
+        handler = handlers[host]
+        elapsed = round(timings.get(host, 0), 2)
+        for network in handler.networks:
+            fetch_time = handler.fetch_timings.get(network["name"])
+            fetch_status = f", fetch {round(fetch_time, 2)}s" if fetch_time else ""
+            if result.ok:
+                click.echo(
+                    f"  '{network['name']}' -> {host}: synced in {elapsed}s{fetch_status}"
                 )
-        eero_table = DHCPClientTable(eero_clients)
-
-        adguard_clients = []
-        for client in self.adguard_client.get_clients():
-            try:
-                adguard_clients.append(client.to_dhcp_client())
-            except ValueError:
+            else:
                 click.secho(
-                    f"AdGuard device missing MAC address, skipped device named '{client.name}'",
+                    f"  '{network['name']}' -> {host}: failed after {elapsed}s: {result.error}",
                     fg="red",
                 )
-        adguard_table = DHCPClientTable(adguard_clients)
 
-        dhcp_diff = adguard_table.compare(eero_table)
-        if not overwrite:
-            self.update(dhcp_diff)
-        self.create(dhcp_diff)
-        if delete:
-            self.delete(dhcp_diff)
+
+def start_profiler(report_path: str = None, stacks_path: str = None):
+    profiler = SyncProfiler()
+    metrics.phase_listeners.append(profiler)
+    profiler.start()
+
+    def finish():
+        profiler.stop()
+        metrics.phase_listeners.remove(profiler)
+        if report_path:
+            profiler.write_report(report_path)
+            click.echo(f"Profile written to {report_path}")
+        if stacks_path:
+            profiler.write_stacks(stacks_path)
+            click.echo(f"Profile stacks written to {stacks_path}")
+
+    # Runs however the command exits, including aborted prompts
+    click.get_current_context().call_on_close(finish)
+
+
+def authenticate_eero(eero_cookie: str = None, eero_user: str = None) -> EeroClient:
+    eero_client = EeroClient(eero_cookie)
+    if eero_client.needs_login():
+        if not eero_user:
+            eero_user = click.prompt("Eero email address or phone number", type=str)
+        click.echo("Authenticating Eero...")
+        with metrics.phase("eero_auth"):
+            user_token = eero_client.login(eero_user)
+        verification_code = click.prompt("Verification code from email or SMS")
+        click.echo("Verifying code...")
+        with metrics.phase("eero_auth_verify"):
+            eero_client.login_verify(verification_code, user_token)
+        click.echo("Eero successfully authenticated")
+    else:
+        click.echo("Using cached Eero credentials")
+    return eero_client
+
+
+def prompt_adguard_credentials(
+    adguard_host: str = None,
+    adguard_user: str = None,
+    adguard_password: str = None,
+) -> tuple[str, AdGuardCredentialSet]:
+    if not adguard_host:
+        adguard_host = click.prompt("AdGuard host IP address", type=str)
+    if not adguard_user:
+        adguard_user = click.prompt("AdGuard username", type=str)
+    if not adguard_password:
+        adguard_password = click.prompt("AdGuard password", type=str, hide_input=True)
+    return adguard_host, AdGuardCredentialSet(adguard_user, adguard_password)
+
+
+def restore_adguard_session(
+    adguard_client: Union[AdGuardClient, AsyncAdGuardClient],
+    adguard_host: str,
+    credentials: AdGuardCredentialSet,
+    session_cache: SessionCache,
+) -> bool:
+    key = SessionCache.key(
+        "adguard", AdGuardClient.server_url(adguard_host), credentials.name
+    )
+
+    def store(cookie: Optional[str]):
+        if cookie:
+            session_cache.set(key, cookie, ADGUARD_SESSION_TTL)
+
+    # Also stores the new cookie when a rejected one is refreshed mid-sync
+    adguard_client.login_hooks.append(store)
+    cookie = session_cache.get(key)
+    if cookie is None:
+        return False
+    adguard_client.restore_session(credentials, cookie)
+    return True
+
+
+def create_executor(
+    adguard_host: str,
+    concurrency: int = 1,
+    safe: bool = False,
+    use_asyncio: bool = False,
+    **client_options,
+) -> RequestExecutor:
+    if use_asyncio:
+        return AsyncExecutor(
+            AsyncAdGuardClient(adguard_host, pool_size=concurrency, **client_options),
+            concurrency,
+            safe,
+        )
+    return ThreadedExecutor(
+        AdGuardClient(adguard_host, pool_size=concurrency, **client_options),
+        concurrency,
+        safe,
+    )
+
+
+def authenticate_adguard(
+    executor: RequestExecutor,
+    adguard_host: str,
+    credentials: AdGuardCredentialSet,
+    session_cache: SessionCache = None,
+) -> RequestExecutor:
+    try:
+        if session_cache is not None and restore_adguard_session(
+            executor.adguard_client, adguard_host, credentials, session_cache
+        ):
+            click.echo("Using cached AdGuard session")
+            return executor
+        click.echo("Authenticating AdGuard...")
+        executor.call(executor.adguard_client.authenticate, credentials)
+    except BaseException:
+        executor.close()
+        raise
+    click.echo("AdGuard successfully authenticated")
+    return executor
 
 
 @click.command()
-@click.option(
-    "--adguard-host",
-    help="AdGuard Home host IP address",
-    type=str,
-)
-@click.option(
-    "--adguard-user",
-    help="AdGuard Home username",
-    type=str,
-)
-@click.option(
-    "--adguard-password",
-    help="AdGuard Home password",
-    type=str,
+@adguard_options(
+    "AdGuard Home host IP address, repeat to sync several replicas", multiple=True
 )
+@eero_options
+@delete_option
 @click.option(
-    "--eero-user",
-    help="Eero email address or phone number",
-    type=str,
-)
-@click.option(
-    "--eero-cookie",
-    help="Eero session cookie",
-    type=str,
-)
-@click.option(
-    "--delete",
-    "-d",
+    "--confirm",
+    "-y",
     is_flag=True,
     default=False,
-    help="Delete AdGuard clients not found in Eero DHCP list",
+    help="Skip interactive confirmation",
 )
+@overwrite_option
+@request_options
 @click.option(
-    "--confirm",
-    "-y",
+    "--asyncio",
+    "use_asyncio",
     is_flag=True,
     default=False,
-    help="Skip interactive confirmation",
+    help="Pipeline AdGuard requests over an asyncio connection pool",
 )
+@full_option
 @click.option(
-    "--overwrite",
-    "-o",
+    "--resume",
     is_flag=True,
     default=False,
-    help="Delete all AdGuard clients before sync",
+    help="Finish an interrupted sync from its journal instead of starting over",
+)
+@conflict_option
+@network_option
+@click.option(
+    "--network-target",
+    multiple=True,
+    help="Sync an Eero network to its own AdGuard host, as NETWORK=HOST, can be repeated",
+)
+@metrics_file_option
+@click.option(
+    "--profile",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Profile CPU and memory use of each sync phase and write a report to this file",
+)
+@click.option(
+    "--profile-stacks",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write sampled call stacks to this file in flamegraph collapsed format",
 )
 @click.option(
     "--debug",
@@ -198,7 +377,7 @@ class EeroAdGuardSyncHandler:
     help="Display debug information",
 )
 def sync(
-    adguard_host: str = None,
+    adguard_host: tuple[str] = (),
     adguard_user: str = None,
     adguard_password: str = None,
     eero_user: str = None,
@@ -206,57 +385,164 @@ def sync(
     delete: bool = False,
     confirm: bool = False,
     overwrite: bool = False,
+    concurrency: int = 1,
+    safe: bool = False,
+    timeout: float = 30,
+    retries: int = 3,
+    max_rate: float = None,
+    target_latency: float = 2,
+    use_asyncio: bool = False,
+    full: bool = False,
+    resume: bool = False,
+    on_conflict: str = "skip",
     debug: bool = False,
+    network: tuple[str] = (),
+    network_target: tuple[str] = (),
+    metrics_file: str = None,
+    profile: str = None,
+    profile_stacks: str = None,
     *args,
     **kwargs,
 ):
+    if profile or profile_stacks:
+        start_profiler(profile, profile_stacks)
+
     # Eero auth
-    eero_client = EeroClient(eero_cookie)
-    if eero_client.needs_login():
-        if not eero_user:
-            eero_user = click.prompt("Eero email address or phone number", type=str)
-        click.echo("Authenticating Eero...")
-        user_token = eero_client.login(eero_user)
-        verification_code = click.prompt("Verification code from email or SMS")
-        click.echo("Verifying code...")
-        eero_client.login_verify(verification_code, user_token)
-        click.echo("Eero successfully authenticated")
-    else:
-        click.echo("Using cached Eero credentials")
+    eero_client = authenticate_eero(eero_cookie, eero_user)
     if debug:
         click.echo(f"Eero cookie value: {eero_client.session.cookie}")
         exit()
 
+    session_cache = SessionCache(SessionCache.default_path)
+    networks = select_networks(eero_client, network, session_cache)
+    targets = parse_network_targets(eero_client, networks, network_target)
+
     # AdGuard auth
-    if not adguard_host:
-        adguard_host = click.prompt("AdGuard host IP address", type=str)
-    adguard_client = AdGuardClient(adguard_host)
-    if not adguard_user:
-        adguard_user = click.prompt("AdGuard username", type=str)
-    if not adguard_password:
-        adguard_password = click.prompt("AdGuard password", type=str, hide_input=True)
-    adguard_creds = AdGuardCredentialSet(adguard_user, adguard_password)
-    click.echo("Authenticating AdGuard...")
-    adguard_client.authenticate(adguard_creds)
-    click.echo("AdGuard successfully authenticated")
+    adguard_hosts = list(dict.fromkeys(adguard_host))
+    prompt_host = adguard_hosts[0] if adguard_hosts else None
+    if not prompt_host and len(targets) == len(networks):
+        prompt_host = next(iter(targets.values()))
+    prompt_host, adguard_creds = prompt_adguard_credentials(
+        prompt_host, adguard_user, adguard_password
+    )
+    if not adguard_hosts:
+        adguard_hosts = [prompt_host]
+    groups: dict[str, list[dict]] = {}
+    for selected_network in networks:
+        if selected_network["url"] in targets:
+            hosts = [targets[selected_network["url"]]]
+        else:
+            hosts = adguard_hosts
+        for host in hosts:
+            groups.setdefault(host, []).append(selected_network)
 
     # Handle
-    handler = EeroAdGuardSyncHandler(eero_client, adguard_client)
+    executor_options = dict(
+        concurrency=concurrency,
+        safe=safe,
+        use_asyncio=use_asyncio,
+        timeout=timeout,
+        retries=retries,
+        max_write_rate=max_rate,
+        target_latency=target_latency,
+    )
+    handlers: dict[str, EeroAdGuardSyncHandler] = {}
+    fetch_cache = FetchCache()
+    for host, group_networks in groups.items():
+        executor = None
+        if len(groups) == 1:
+            executor = authenticate_adguard(
+                create_executor(host, **executor_options),
+                host,
+                adguard_creds,
+                session_cache,
+            )
+            fingerprint_path = FingerprintStore.default_path
+            journal_path = OperationJournal.default_path
+        else:
+            fingerprint_path = host_path(FingerprintStore.default_path, host)
+            journal_path = host_path(OperationJournal.default_path, host)
+        handlers[host] = EeroAdGuardSyncHandler(
+            eero_client,
+            executor,
+            FingerprintStore(fingerprint_path),
+            full,
+            on_conflict == "rename",
+            group_networks,
+            host if len(groups) > 1 else None,
+            fetch_cache,
+            OperationJournal(journal_path),
+        )
+    resume_states: dict[str, JournalState] = {}
+    if resume:
+        for host, handler in handlers.items():
+            state = handler.journal.load()
+            # The single host journal is shared, it may be for another host
+            if state is None or state.header["host"] != AdGuardClient.server_url(host):
+                click.echo(f"No interrupted sync of {host} found, starting a new one")
+            else:
+                resume_states[host] = state
     if overwrite:
         delete = False
     if not confirm:
-        click.confirm(f"Sync this network?", abort=True)
+        if len(networks) == 1:
+            click.confirm(f"Sync this network?", abort=True)
+        else:
+            click.confirm(f"Sync these {len(networks)} networks?", abort=True)
         if overwrite:
             click.confirm(
-                "WARNING: All clients in AdGuard will be deleted, confirm?", abort=True
+                "WARNING: Clients in AdGuard not found in Eero's DHCP list will be deleted "
+                "and the settings of all other clients reset, confirm?",
+                abort=True,
             )
         if delete:
             click.confirm(
                 "WARNING: Clients in AdGuard not found in Eero's DHCP list will be deleted, confirm?",
                 abort=True,
             )
+
+    timings: dict[str, float] = {}
+
+    def sync_target(host: str):
+        target_start = timer()
+        handler = handlers[host]
+        try:
+            if handler.executor is None:
+                # Authenticated per target so one failing replica doesn't stop the rest
+                handler.executor = authenticate_adguard(
+                    create_executor(host, **executor_options),
+                    host,
+                    adguard_creds,
+                    session_cache,
+                )
+            with handler.executor:
+                state = resume_states.get(host)
+                if state is not None:
+                    handler.resume(state)
+                else:
+                    handler.sync(delete, overwrite)
+        finally:
+            timings[host] = timer() - target_start
+
     click.echo("Starting sync...")
     start = timer()
-    handler.sync(delete, overwrite)
-    elapsed = timer() - start
+    failed = []
+    success = False
+    try:
+        if len(handlers) == 1:
+            sync_target(next(iter(handlers)))
+        else:
+            results = WorkerPool(len(handlers)).run(sync_target, list(handlers))
+            report_summary(handlers, results, timings)
+            failed = [result for result in results if not result.ok]
+        success = not failed
+    finally:
+        elapsed = timer() - start
+        metrics.record_run(success, elapsed)
+        if metrics_file:
+            metrics.write(metrics_file)
     click.echo(f"Sync complete in {round(elapsed, 2)}s")
+    if failed:
+        raise click.ClickException(
+            f"{len(failed)} of {len(handlers)} AdGuard targets failed to sync"
+        )
@@ -1,17 +1,57 @@
+import importlib
+
 import click
 
-from eero_adguard_sync import VERSION
-from eero_adguard_sync.commands import sync, clear
 
+class LazyGroup(click.Group):
+    def __init__(self, *args, lazy_commands: dict[str, str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted([*super().list_commands(ctx), *self.lazy_commands])
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command:
+        if cmd_name not in self.lazy_commands:
+            return super().get_command(ctx, cmd_name)
+        # Command modules pull in requests, eero and aiohttp, only import the one
+        # that runs
+        module_name, attribute = self.lazy_commands[cmd_name].rsplit(".", 1)
+        command = getattr(importlib.import_module(module_name), attribute)
+        self.add_command(command, cmd_name)
+        del self.lazy_commands[cmd_name]
+        return command
 
-@click.group()
-@click.version_option(VERSION)
-def cli():
-    pass
 
+def print_version(ctx: click.Context, param: click.Parameter, value: bool):
+    if not value or ctx.resilient_parsing:
+        return
+    from eero_adguard_sync import VERSION
 
-cli.add_command(sync)
-cli.add_command(clear)
+    click.echo(f"{ctx.find_root().info_name}, version {VERSION}")
+    ctx.exit()
+
+
+@click.group(
+    cls=LazyGroup,
+    lazy_commands={
+        "sync": "eero_adguard_sync.commands.sync.sync",
+        "clear": "eero_adguard_sync.commands.clear.clear",
+        "daemon": "eero_adguard_sync.commands.daemon.daemon",
+        "plan": "eero_adguard_sync.commands.plan.plan",
+        "apply": "eero_adguard_sync.commands.plan.apply",
+    },
+)
+@click.option(
+    "--version",
+    is_flag=True,
+    expose_value=False,
+    is_eager=True,
+    callback=print_version,
+    help="Show the version and exit.",
+)
+def cli():
+    pass
 
 
 if __name__ == "__main__":
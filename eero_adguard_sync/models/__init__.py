@@ -1,3 +1,21 @@
-from .dhcp import DHCPClient, DHCPClientDevice, DHCPClientTableDiff, DHCPClientTable
-from .adguard import AdGuardCredentialSet, AdGuardClientDevice
+from .dhcp import (
+    DHCPClient,
+    DHCPClientDevice,
+    DHCPClientTableDiff,
+    DHCPClientTable,
+    DHCPClientFieldChange,
+    DHCPClientConflict,
+    DHCPClientIndex,
+    Identifier,
+    IdentifierKind,
+    parse_identifier,
+    normalize_identifiers,
+    clear_identifier_cache,
+)
+from .adguard import (
+    AdGuardCredentialSet,
+    AdGuardClientDevice,
+    AdGuardSyncPlan,
+    AdGuardSyncPlanAction,
+)
 from .eero import EeroClientDevice, EeroNetworkDevice
@@ -1,2 +1,3 @@
 from .client_device import AdGuardClientDevice
 from .credential_set import AdGuardCredentialSet
+from .sync_plan import AdGuardSyncPlan, AdGuardSyncPlanAction
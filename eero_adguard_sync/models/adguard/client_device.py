@@ -1,48 +1,101 @@
+import hashlib
 import ipaddress
+import json
 from dataclasses import dataclass, field, asdict
-from typing import Union
+from typing import Optional, Union
 
 import macaddress
 
-from eero_adguard_sync.models import DHCPClientDevice, DHCPClient
+from eero_adguard_sync.models import (
+    DHCPClientDevice,
+    DHCPClient,
+    DHCPClientFieldChange,
+)
+from eero_adguard_sync.models.dhcp.identifier import (
+    DATACLASS_SLOTS,
+    Identifier,
+    normalize_identifiers,
+    parse_identifier,
+)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class AdGuardClientDevice(DHCPClientDevice):
     ids: list[str]
     name: str
     tags: list[str]
     use_global_settings: bool = True
     use_global_blocked_services: bool = True
-    params: dict = field(default_factory=dict)
+    params: Optional[dict] = field(default_factory=dict)
+    # Settings as sent by AdGuard, only decoded for clients that get updated
+    raw_params: Optional[str] = field(default=None, repr=False, compare=False)
+
+    def load_params(self) -> Optional[dict]:
+        if self.params is None and self.raw_params is not None:
+            self.params = json.loads(self.raw_params)
+        return self.params
+
+    def release_params(self):
+        self.params = None
+        self.raw_params = None
 
     @property
     def update_dict(self) -> dict:
+        if self.load_params() is None:
+            raise ValueError("Client params were released and cannot be updated")
         data = asdict(self)
+        data.pop("raw_params")
         data.pop("use_global_settings")
         data.pop("use_global_blocked_services")
         return data
 
     @property
-    def mac_address(self) -> macaddress.MAC:
+    def normalized_ids(self) -> frozenset[str]:
+        return normalize_identifiers(self.ids)
+
+    @property
+    def fingerprint(self) -> str:
+        data = {
+            "ids": sorted(self.normalized_ids),
+            "name": self.name,
+            "tags": sorted(set(self.tags or [])),
+        }
+        return hashlib.sha256(
+            json.dumps(data, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def __mac_identifier(self) -> Identifier:
         for identifier in self.ids:
-            try:
-                return macaddress.MAC(identifier)
-            except ValueError:
-                continue
+            parsed = parse_identifier(identifier)
+            if parsed.is_mac:
+                return parsed
         raise ValueError("No valid MAC address")
 
+    @property
+    def mac_address(self) -> macaddress.MAC:
+        return self.__mac_identifier().mac_address
+
+    @property
+    def ip_identifiers(self) -> list[Identifier]:
+        return [i for i in map(parse_identifier, self.ids) if i.is_ip]
+
     @property
     def ip_addresses(
         self,
     ) -> list[Union[ipaddress.IPv4Interface, ipaddress.IPv6Interface]]:
-        ip_addresses = []
-        for identifier in self.ids:
-            try:
-                ip_addresses.append(ipaddress.ip_interface(identifier))
-            except ValueError:
-                continue
-        return ip_addresses
+        return [ipaddress.ip_interface(i.packed) for i in self.ip_identifiers]
+
+    def changes(self, device: "AdGuardClientDevice") -> list[DHCPClientFieldChange]:
+        changes = []
+        if self.normalized_ids != device.normalized_ids:
+            changes.append(
+                DHCPClientFieldChange("ids", sorted(self.ids), sorted(device.ids))
+            )
+        if self.name != device.name:
+            changes.append(DHCPClientFieldChange("name", self.name, device.name))
+        if set(self.tags or []) != set(device.tags or []):
+            changes.append(DHCPClientFieldChange("tags", self.tags, device.tags))
+        return changes
 
     @classmethod
     def from_dhcp_client(cls, dhcp_client: "DHCPClient") -> "AdGuardClientDevice":
@@ -56,8 +109,8 @@ class AdGuardClientDevice(DHCPClientDevice):
 
     def to_dhcp_client(self) -> DHCPClient:
         return DHCPClient(
-            mac_address=self.mac_address,
-            ip_interfaces=self.ip_addresses,
+            mac_address=self.__mac_identifier().value,
+            ip_interfaces=self.ip_identifiers,
             nickname=self.name,
             instance=self,
             tags=self.tags,
@@ -0,0 +1,48 @@
+import json
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+
+
+@dataclass
+class AdGuardSyncPlanAction:
+    mac_address: str
+    nickname: str
+    payload: dict
+
+    @property
+    def mac_identifier(self) -> str:
+        return self.mac_address
+
+
+@dataclass
+class AdGuardSyncPlan:
+    adguard_host: str
+    adguard_version: str
+    networks: list[dict]
+    add: list[AdGuardSyncPlanAction] = field(default_factory=list)
+    update: list[AdGuardSyncPlanAction] = field(default_factory=list)
+    delete: list[AdGuardSyncPlanAction] = field(default_factory=list)
+    fingerprints: dict[str, str] = field(default_factory=dict)
+    created: str = field(
+        default_factory=lambda: datetime.now().isoformat(timespec="seconds")
+    )
+    schema_version = 1
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.add or self.update or self.delete)
+
+    def save(self, path: str):
+        data = {"schema": self.schema_version, **asdict(self)}
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "AdGuardSyncPlan":
+        with open(path, "r") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.pop("schema", None) != cls.schema_version:
+            raise ValueError(f"Unsupported sync plan format in '{path}'")
+        for key in ("add", "update", "delete"):
+            data[key] = [AdGuardSyncPlanAction(**i) for i in data.get(key, [])]
+        return cls(**data)
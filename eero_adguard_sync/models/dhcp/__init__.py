@@ -1,2 +1,16 @@
-from .client_table import DHCPClientTable, DHCPClient, DHCPClientTableDiff
+from .client_table import (
+    DHCPClientTable,
+    DHCPClient,
+    DHCPClientTableDiff,
+    DHCPClientFieldChange,
+    DHCPClientConflict,
+    DHCPClientIndex,
+)
 from .client_device import DHCPClientDevice
+from .identifier import (
+    Identifier,
+    IdentifierKind,
+    parse_identifier,
+    normalize_identifiers,
+    clear_identifier_cache,
+)
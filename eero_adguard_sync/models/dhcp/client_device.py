@@ -7,6 +7,8 @@ T = TypeVar("T")
 
 
 class DHCPClientDevice(ABC, Generic[T]):
+    __slots__ = ()
+
     @abstractmethod
     def to_dhcp_client(self) -> DHCPClient:
         raise NotImplementedError
@@ -1,41 +1,228 @@
+import hashlib
 import ipaddress
-from typing import Union
+import json
+from typing import Any, Optional, Union
 from dataclasses import dataclass, field
 
 import macaddress
 
+from .identifier import ip_identifiers, mac_identifier
+
+IPAddress = Union[
+    ipaddress.IPv4Address,
+    ipaddress.IPv6Address,
+    ipaddress.IPv4Interface,
+    ipaddress.IPv6Interface,
+]
+
 
 @dataclass
+class DHCPClientFieldChange:
+    field: str
+    old: Any
+    new: Any
+
+
 class DHCPClient:
-    mac_address: macaddress.MAC
-    ip_interfaces: list[Union[ipaddress.IPv4Interface, ipaddress.IPv6Interface]]
-    nickname: str
-    instance: object
-    tags: list[str] = field(default_factory=list)
+    __slots__ = ("mac", "packed_ips", "nickname", "instance", "tags")
+
+    def __init__(
+        self,
+        mac_address: Union[macaddress.MAC, int],
+        ip_interfaces: list[IPAddress],
+        nickname: str,
+        instance: object,
+        tags: list[str] = None,
+    ):
+        self.mac = int(mac_address)
+        self.packed_ips = tuple(interface.packed for interface in ip_interfaces)
+        self.nickname = nickname
+        self.instance = instance
+        self.tags = tags if tags is not None else []
+
+    def __repr__(self) -> str:
+        return (
+            f"DHCPClient(mac_address={self.mac_identifier!r}, "
+            f"ip_addresses={[str(i) for i in self.ip_addresses]!r}, "
+            f"nickname={self.nickname!r}, tags={self.tags!r})"
+        )
+
+    @property
+    def mac_address(self) -> macaddress.MAC:
+        return macaddress.MAC(self.mac)
+
+    @property
+    def ip_addresses(self) -> list[Union[ipaddress.IPv4Address, ipaddress.IPv6Address]]:
+        return [ipaddress.ip_address(packed) for packed in self.packed_ips]
+
+    @property
+    def ip_interfaces(
+        self,
+    ) -> list[Union[ipaddress.IPv4Interface, ipaddress.IPv6Interface]]:
+        return [ipaddress.ip_interface(packed) for packed in self.packed_ips]
+
+    @property
+    def mac_identifier(self) -> str:
+        return mac_identifier(self.mac)
+
+    @property
+    def ip_identifiers(self) -> set[str]:
+        return {ip_identifiers(packed)[0] for packed in self.packed_ips}
 
     @property
     def identifiers(self) -> set[str]:
-        identifiers = {str(self.mac_address)}
-        for interface in self.ip_interfaces:
-            identifiers.add(interface.ip.exploded)
-            identifiers.add(interface.ip.compressed)
+        identifiers = {mac_identifier(self.mac)}
+        for packed in self.packed_ips:
+            identifiers.update(ip_identifiers(packed))
         return identifiers
 
+    def copy(self, **changes) -> "DHCPClient":
+        client = DHCPClient.__new__(DHCPClient)
+        for slot in self.__slots__:
+            setattr(client, slot, getattr(self, slot))
+        if "mac_address" in changes:
+            client.mac = int(changes.pop("mac_address"))
+        if "ip_interfaces" in changes:
+            client.packed_ips = tuple(i.packed for i in changes.pop("ip_interfaces"))
+        for key, value in changes.items():
+            setattr(client, key, value)
+        return client
+
+    def changes(self, client: "DHCPClient") -> list[DHCPClientFieldChange]:
+        changes = []
+        if self.identifiers != client.identifiers:
+            changes.append(
+                DHCPClientFieldChange(
+                    "identifiers", sorted(self.identifiers), sorted(client.identifiers)
+                )
+            )
+        if self.nickname != client.nickname:
+            changes.append(
+                DHCPClientFieldChange("nickname", self.nickname, client.nickname)
+            )
+        if set(self.tags) != set(client.tags):
+            changes.append(DHCPClientFieldChange("tags", self.tags, client.tags))
+        return changes
+
+
+@dataclass
+class DHCPClientConflict:
+    client: DHCPClient
+    field: str
+    value: str
+    existing: DHCPClient
+
+
+class DHCPClientIndex:
+    def __init__(self, clients: list[DHCPClient] = None):
+        self.by_mac: dict[str, DHCPClient] = {}
+        self.by_ip: dict[str, list[DHCPClient]] = {}
+        self.by_name: dict[str, list[DHCPClient]] = {}
+        for client in clients or []:
+            self.add(client)
+
+    def add(self, client: DHCPClient):
+        self.by_mac[client.mac_identifier] = client
+        for ip in client.ip_identifiers:
+            self.by_ip.setdefault(ip, []).append(client)
+        self.by_name.setdefault(client.nickname, []).append(client)
+
+    @staticmethod
+    def __discard(index: dict[str, list[DHCPClient]], key: str, client: DHCPClient):
+        clients = [i for i in index.get(key, []) if i is not client]
+        if clients:
+            index[key] = clients
+        else:
+            index.pop(key, None)
+
+    def remove(self, client: DHCPClient):
+        mac_address = client.mac_identifier
+        if self.by_mac.get(mac_address) is client:
+            del self.by_mac[mac_address]
+        for ip in client.ip_identifiers:
+            self.__discard(self.by_ip, ip, client)
+        self.__discard(self.by_name, client.nickname, client)
+
 
 @dataclass
 class DHCPClientTableDiff:
     discovered: list[DHCPClient]
     associated: list[tuple[DHCPClient, DHCPClient]]
     missing: list[DHCPClient]
+    changes: dict[str, list[DHCPClientFieldChange]] = field(default_factory=dict)
+
+    @property
+    def changed(self) -> list[tuple[DHCPClient, DHCPClient]]:
+        return [i for i in self.associated if self.changes.get(i[0].mac_identifier)]
+
+    @property
+    def unchanged(self) -> list[tuple[DHCPClient, DHCPClient]]:
+        return [i for i in self.associated if not self.changes.get(i[0].mac_identifier)]
 
 
-@dataclass
 class DHCPClientTable:
-    clients: list[DHCPClient]
+    def __init__(self, clients: list[DHCPClient]):
+        # Keyed by identity so removing a client doesn't scan the whole table
+        self.__clients: dict[int, DHCPClient] = {id(i): i for i in clients}
+        self.__list: Optional[list[DHCPClient]] = None
+        self.index = DHCPClientIndex(clients)
+
+    def __repr__(self) -> str:
+        return f"DHCPClientTable(clients={self.clients!r})"
+
+    @property
+    def clients(self) -> list[DHCPClient]:
+        if self.__list is None:
+            self.__list = list(self.__clients.values())
+        return self.__list
 
     @property
     def hash_table(self) -> dict[str, DHCPClient]:
-        return {str(i.mac_address): i for i in self.clients}
+        return self.index.by_mac
+
+    @property
+    def fingerprint(self) -> str:
+        data = sorted(
+            [
+                client.mac_identifier,
+                sorted(client.ip_identifiers),
+                client.nickname,
+                sorted(set(client.tags)),
+            ]
+            for client in self.clients
+        )
+        return hashlib.sha256(
+            json.dumps(data, separators=(",", ":")).encode("utf-8")
+        ).hexdigest()
+
+    def add(self, client: DHCPClient):
+        existing = self.index.by_mac.get(client.mac_identifier)
+        if existing is not None:
+            self.remove(existing)
+        self.__clients[id(client)] = client
+        self.__list = None
+        self.index.add(client)
+
+    def remove(self, client: DHCPClient):
+        if self.__clients.pop(id(client), None) is not None:
+            self.__list = None
+        self.index.remove(client)
+
+    def conflicts(self, client: DHCPClient) -> list[DHCPClientConflict]:
+        mac_address = client.mac_identifier
+        conflicts = []
+        for existing in self.index.by_name.get(client.nickname, []):
+            if existing.mac_identifier != mac_address:
+                conflicts.append(
+                    DHCPClientConflict(client, "name", client.nickname, existing)
+                )
+                break
+        for ip in sorted(client.ip_identifiers):
+            for existing in self.index.by_ip.get(ip, []):
+                if existing.mac_identifier != mac_address:
+                    conflicts.append(DHCPClientConflict(client, "ip", ip, existing))
+                    break
+        return conflicts
 
     def __discover(self, table: "DHCPClientTable") -> list[DHCPClient]:
         tbl = self.hash_table
@@ -51,9 +238,29 @@ class DHCPClientTable:
         tbl = table.hash_table
         return [v for k, v in self.hash_table.items() if k not in tbl]
 
-    def compare(self, table: "DHCPClientTable") -> DHCPClientTableDiff:
+    @staticmethod
+    def __changes(
+        associated: list[tuple[DHCPClient, DHCPClient]], model: Optional[type] = None
+    ) -> dict[str, list[DHCPClientFieldChange]]:
+        changes = {}
+        for source, target in associated:
+            if model is None:
+                client_changes = source.changes(target)
+            else:
+                client_changes = model.from_dhcp_client(source).changes(
+                    model.from_dhcp_client(target)
+                )
+            if client_changes:
+                changes[source.mac_identifier] = client_changes
+        return changes
+
+    def compare(
+        self, table: "DHCPClientTable", model: Optional[type] = None
+    ) -> DHCPClientTableDiff:
+        associated = self.__associate(table)
         return DHCPClientTableDiff(
             discovered=self.__discover(table),
-            associated=self.__associate(table),
+            associated=associated,
             missing=self.__prune(table),
+            changes=self.__changes(associated, model),
         )
@@ -0,0 +1,98 @@
+import ipaddress
+import sys
+from dataclasses import dataclass
+from enum import Enum
+from functools import lru_cache
+from typing import Iterable, Optional, Union
+
+import macaddress
+
+IDENTIFIER_CACHE_SIZE = 65536
+
+# Dataclass slots are only available from Python 3.10
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+class IdentifierKind(Enum):
+    MAC = "mac"
+    IPV4 = "ipv4"
+    IPV6 = "ipv6"
+    CIDR = "cidr"
+    CLIENT_ID = "client_id"
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class Identifier:
+    raw: str
+    kind: IdentifierKind
+    normalized: str
+    value: Optional[Union[int, bytes]] = None
+
+    @property
+    def is_mac(self) -> bool:
+        return self.kind is IdentifierKind.MAC
+
+    @property
+    def is_ip(self) -> bool:
+        return self.kind in (IdentifierKind.IPV4, IdentifierKind.IPV6)
+
+    @property
+    def packed(self) -> bytes:
+        if not self.is_ip:
+            raise ValueError(f"Identifier '{self.raw}' is not an IP address")
+        return self.value
+
+    @property
+    def mac_address(self) -> macaddress.MAC:
+        if not self.is_mac:
+            raise ValueError(f"Identifier '{self.raw}' is not a MAC address")
+        return macaddress.MAC(self.value)
+
+    @property
+    def ip_address(self) -> Union[ipaddress.IPv4Address, ipaddress.IPv6Address]:
+        return ipaddress.ip_address(self.packed)
+
+
+@lru_cache(maxsize=IDENTIFIER_CACHE_SIZE)
+def parse_identifier(raw: str) -> Identifier:
+    try:
+        mac_address = macaddress.MAC(raw)
+        return Identifier(raw, IdentifierKind.MAC, str(mac_address), int(mac_address))
+    except ValueError:
+        pass
+    try:
+        address = ipaddress.ip_address(raw)
+        kind = IdentifierKind.IPV4 if address.version == 4 else IdentifierKind.IPV6
+        return Identifier(raw, kind, address.compressed, address.packed)
+    except ValueError:
+        pass
+    if "/" in raw:
+        try:
+            network = ipaddress.ip_network(raw, strict=False)
+            return Identifier(raw, IdentifierKind.CIDR, str(network))
+        except ValueError:
+            pass
+    # AdGuard only accepts lowercase ClientIDs
+    return Identifier(raw, IdentifierKind.CLIENT_ID, raw.lower())
+
+
+def normalize_identifiers(raw_ids: Iterable[str]) -> frozenset[str]:
+    # AdGuard stores ids in its own spelling, Eero sends dashed MACs and exploded IPv6
+    return frozenset(parse_identifier(raw).normalized for raw in raw_ids)
+
+
+@lru_cache(maxsize=IDENTIFIER_CACHE_SIZE)
+def mac_identifier(mac_address: int) -> str:
+    return str(macaddress.MAC(mac_address))
+
+
+@lru_cache(maxsize=IDENTIFIER_CACHE_SIZE)
+def ip_identifiers(packed: bytes) -> tuple[str, str]:
+    address = ipaddress.ip_address(packed)
+    return address.compressed, address.exploded
+
+
+def clear_identifier_cache():
+    parse_identifier.cache_clear()
+    mac_identifier.cache_clear()
+    ip_identifiers.cache_clear()
@@ -5,6 +5,11 @@ from typing import Union
 import macaddress
 
 from eero_adguard_sync.models import DHCPClientDevice, DHCPClient
+from eero_adguard_sync.models.dhcp.identifier import (
+    DATACLASS_SLOTS,
+    Identifier,
+    parse_identifier,
+)
 
 CLIENT_TAG_MAP: dict[str, str] = {
     "audio": "device_audio",
@@ -35,7 +40,7 @@ CLIENT_TAG_MAP: dict[str, str] = {
 }
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class EeroClientDevice(DHCPClientDevice):
     ips: list[str]
     mac: str
@@ -54,31 +59,32 @@ class EeroClientDevice(DHCPClientDevice):
     def mac_address(self) -> macaddress.MAC:
         return macaddress.MAC(self.mac)
 
+    @property
+    def ip_identifiers(self) -> list[Identifier]:
+        return [i for i in map(parse_identifier, self.ips) if i.is_ip]
+
     @property
     def ip_addresses(
         self,
     ) -> list[Union[ipaddress.IPv4Interface, ipaddress.IPv6Interface]]:
-        ip_addresses = []
-        for ip in self.ips:
-            try:
-                ip_addresses.append(ipaddress.ip_interface(ip))
-            except ValueError:
-                continue
-        return ip_addresses
+        return [ipaddress.ip_interface(i.packed) for i in self.ip_identifiers]
 
     @classmethod
     def from_dhcp_client(cls, dhcp_client: "DHCPClient") -> "EeroClientDevice":
         return cls(
-            ips=[str(i.ip) for i in dhcp_client.ip_interfaces],
+            ips=[str(i) for i in dhcp_client.ip_addresses],
             mac=str(dhcp_client.mac_address),
             nickname=dhcp_client.nickname,
             device_type=dhcp_client.tags[0],
         )
 
     def to_dhcp_client(self) -> DHCPClient:
+        mac_identifier = parse_identifier(self.mac) if self.mac else None
+        if mac_identifier is None or not mac_identifier.is_mac:
+            raise ValueError("No valid MAC address")
         return DHCPClient(
-            mac_address=self.mac_address,
-            ip_interfaces=self.ip_addresses,
+            mac_address=mac_identifier.value,
+            ip_interfaces=self.ip_identifiers,
             nickname=self.nickname,
             instance=self,
             tags=[self.standard_device_type],
@@ -1,9 +1,10 @@
 from dataclasses import dataclass, field
 
+from eero_adguard_sync.models.dhcp.identifier import DATACLASS_SLOTS
 from eero_adguard_sync.models.eero.client_device import EeroClientDevice
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class EeroNetworkDevice:
     mac_address: str
     ip_address: str
@@ -0,0 +1,5 @@
+from .executor import RequestExecutor, ThreadedExecutor, AsyncExecutor
+from .networks import fetch_networks, select_networks, find_network
+from .planner import SyncPlanner, Operation, group_operations
+from .resume import ResumePlan, plan_resume
+from .handler import EeroAdGuardSyncHandler, FetchSource, FetchResult
@@ -0,0 +1,123 @@
+from typing import TYPE_CHECKING, Any, Callable, Hashable, Optional, Union
+
+from eero_adguard_sync.utils import AsyncWorkerPool, WorkerPool, WorkerResult
+
+if TYPE_CHECKING:
+    from eero_adguard_sync.client import AdGuardClient, AsyncAdGuardClient
+
+
+class RequestExecutor:
+    # The sync pipeline is written once, executors decide how client calls run
+    def __init__(
+        self,
+        adguard_client: Union["AdGuardClient", "AsyncAdGuardClient"],
+        concurrency: int = 1,
+        safe: bool = False,
+    ):
+        self.adguard_client = adguard_client
+        self.concurrency = concurrency
+        self.safe = safe
+
+    def __enter__(self) -> "RequestExecutor":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def call(self, func: Callable, *args) -> Any:
+        raise NotImplementedError
+
+    def map(
+        self,
+        func: Callable[[Any], Any],
+        items: list,
+        key: Optional[Callable[[Any], Hashable]] = None,
+        on_complete: Optional[Callable[[int], None]] = None,
+        on_success: Optional[Callable[[Any], None]] = None,
+    ) -> list[WorkerResult]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ThreadedExecutor(RequestExecutor):
+    def call(self, func: Callable, *args) -> Any:
+        return func(*args)
+
+    def map(
+        self,
+        func: Callable[[Any], Any],
+        items: list,
+        key: Optional[Callable[[Any], Hashable]] = None,
+        on_complete: Optional[Callable[[int], None]] = None,
+        on_success: Optional[Callable[[Any], None]] = None,
+    ) -> list[WorkerResult]:
+        pool = WorkerPool(self.concurrency, key if self.safe else None)
+        if on_success is None:
+            return pool.run(func, items, on_complete)
+
+        def run(item):
+            value = func(item)
+            on_success(item)
+            return value
+
+        return pool.run(run, items, on_complete)
+
+    def close(self):
+        self.adguard_client.close()
+
+
+class AsyncExecutor(RequestExecutor):
+    def __init__(
+        self,
+        adguard_client: "AsyncAdGuardClient",
+        concurrency: int = 1,
+        safe: bool = False,
+    ):
+        import asyncio
+
+        super().__init__(adguard_client, concurrency, safe)
+        # One loop for the executor's lifetime, the client's connections belong to it
+        self.__loop = asyncio.new_event_loop()
+
+    def call(self, func: Callable, *args) -> Any:
+        return self.__loop.run_until_complete(func(*args))
+
+    def map(
+        self,
+        func: Callable[[Any], Any],
+        items: list,
+        key: Optional[Callable[[Any], Hashable]] = None,
+        on_complete: Optional[Callable[[int], None]] = None,
+        on_success: Optional[Callable[[Any], None]] = None,
+    ) -> list[WorkerResult]:
+        pool = AsyncWorkerPool(self.concurrency, key if self.safe else None)
+        if on_success is None:
+            return self.call(pool.run, func, items, on_complete)
+
+        async def run(item):
+            value = await func(item)
+            on_success(item)
+            return value
+
+        return self.call(pool.run, run, items, on_complete)
+
+    def close(self):
+        import asyncio
+
+        if self.__loop.is_closed():
+            return
+        try:
+            # Like asyncio.run, requests left behind by an interrupted call are cancelled
+            pending = asyncio.all_tasks(self.__loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self.__loop.run_until_complete(
+                    asyncio.gather(*pending, return_exceptions=True)
+                )
+            self.call(self.adguard_client.close)
+            self.call(self.__loop.shutdown_asyncgens)
+        finally:
+            self.__loop.close()
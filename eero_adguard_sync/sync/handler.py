@@ -0,0 +1,463 @@
+from dataclasses import asdict, dataclass
+from functools import partial
+from timeit import default_timer as timer
+from typing import Any, Callable, Optional
+
+import click
+from requests import HTTPError
+
+from eero_adguard_sync.client import AdGuardResponseError, EeroClient
+from eero_adguard_sync.models import (
+    AdGuardSyncPlan,
+    AdGuardSyncPlanAction,
+    DHCPClient,
+    DHCPClientDevice,
+    DHCPClientTable,
+    DHCPClientTableDiff,
+    EeroClientDevice,
+)
+from eero_adguard_sync.sync.executor import RequestExecutor
+from eero_adguard_sync.sync.networks import select_networks
+from eero_adguard_sync.sync.planner import Operation, SyncPlanner, group_operations
+from eero_adguard_sync.sync.resume import plan_resume
+from eero_adguard_sync.utils import (
+    FetchCache,
+    FingerprintStore,
+    JournalState,
+    OperationJournal,
+    WorkerPool,
+    WorkerResult,
+    metrics,
+)
+
+
+@dataclass
+class FetchSource:
+    system: str
+    label: str
+    phase: str
+    fetch: Callable[[], Any]
+    network: str = None
+
+
+@dataclass
+class FetchResult:
+    clients: list[DHCPClient]
+    skipped: list[DHCPClientDevice]
+    seconds: float
+
+
+class EeroAdGuardSyncHandler:
+    # Operation kind to metrics phase, progress label and client method
+    replay_steps = {
+        "add": ("create", "Add new clients", "add_client_payload"),
+        "update": ("update", "Update existing clients", "update_client_payload"),
+        "delete": ("delete", "Delete removed clients", "remove_client_payload"),
+    }
+
+    def __init__(
+        self,
+        eero_client: EeroClient,
+        executor: RequestExecutor = None,
+        fingerprint_store: FingerprintStore = None,
+        full: bool = False,
+        rename_conflicts: bool = False,
+        networks: list[dict] = None,
+        label: str = None,
+        fetch_cache: FetchCache = None,
+        journal: OperationJournal = None,
+    ):
+        self.eero_client = eero_client
+        self.executor = executor
+        self.fingerprint_store = fingerprint_store
+        self.planner = SyncPlanner(
+            self.__echo, fingerprint_store, full, rename_conflicts
+        )
+        self.networks = networks or select_networks(eero_client)
+        self.label = label
+        self.fetch_cache = fetch_cache
+        self.journal = journal
+        self.fetch_timings: dict[str, float] = {}
+        self.unparsed_clients: list[DHCPClientDevice] = []
+
+    @property
+    def adguard_client(self):
+        return self.executor.adguard_client
+
+    @property
+    def network(self) -> str:
+        return self.networks[0]["url"]
+
+    def __echo(self, message: str, **styles):
+        if self.label:
+            message = f"[{self.label}] {message}"
+        click.secho(message, **styles)
+
+    def __run(
+        self,
+        phase: str,
+        label: str,
+        func: Callable,
+        items: list,
+        key: Callable = None,
+        on_success: Callable = None,
+    ) -> list[WorkerResult]:
+        with metrics.phase(phase):
+            if self.label:
+                # Progress bars from parallel syncs would overwrite each other
+                self.__echo(f"{label} ({len(items)})")
+                return self.executor.map(func, items, key, on_success=on_success)
+            with click.progressbar(
+                length=len(items), label=label, show_pos=True
+            ) as bar:
+                return self.executor.map(func, items, key, bar.update, on_success)
+
+    def __raise_errors(self, results: list[WorkerResult]):
+        errors = [result for result in results if not result.ok]
+        if not errors:
+            return
+        for result in errors[1:]:
+            self.__echo(f"Additional error: {result.error}", fg="red")
+        raise errors[0].error
+
+    @staticmethod
+    def __is_duplicate_error(error: Exception) -> bool:
+        if isinstance(error, HTTPError):
+            text = error.response.text
+        elif isinstance(error, AdGuardResponseError):
+            text = error.text
+        else:
+            return False
+        errors = [
+            "client already exists",
+            "another client uses the same id",
+        ]
+        return any([True for error in errors if error.lower() in text.lower()])
+
+    def __report_created(self, results: list[WorkerResult]) -> set[str]:
+        duplicate_devices = []
+        unhandled_results = []
+        skipped = set()
+        for result in results:
+            if self.__is_duplicate_error(result.error):
+                action = result.item
+                duplicate_devices.append(f"'{action.nickname}' [{action.mac_address}]")
+                skipped.add(action.mac_address)
+            else:
+                unhandled_results.append(result)
+        for duplicate_device in duplicate_devices:
+            self.__echo(
+                f"Skipped device, duplicate name in Eero network: {duplicate_device}",
+                fg="red",
+            )
+        self.__raise_errors(unhandled_results)
+        return skipped
+
+    def __execute(
+        self,
+        groups: list[tuple[str, list[AdGuardSyncPlanAction]]],
+        indices: dict[int, int] = None,
+    ) -> set[str]:
+        on_success = None
+        if self.journal is not None and indices:
+            on_success = lambda action: self.journal.complete(indices[id(action)])
+        skipped = set()
+        for kind, actions in groups:
+            phase, label, method = self.replay_steps[kind]
+            send = getattr(self.adguard_client, method)
+            results = self.__run(
+                phase,
+                label,
+                lambda action: send(action.payload),
+                actions,
+                lambda action: action.nickname,
+                on_success,
+            )
+            if kind == "add":
+                skipped |= self.__report_created(results)
+            else:
+                self.__raise_errors(results)
+        return skipped
+
+    @staticmethod
+    def __convert(
+        source: str, clients: list[DHCPClientDevice], start: float
+    ) -> FetchResult:
+        dhcp_clients = []
+        skipped = []
+        for client in clients:
+            try:
+                dhcp_clients.append(client.to_dhcp_client())
+            except ValueError:
+                skipped.append(client)
+        return FetchResult(dhcp_clients, skipped, timer() - start)
+
+    def __fetch_source(self, source: FetchSource) -> FetchResult:
+        if source.system == "Eero" and self.fetch_cache is not None:
+            # Replicas of the same networks share one Eero fetch and conversion
+            return self.fetch_cache.get(
+                (source.label, source.network),
+                lambda: self.__fetch_uncached(source),
+            )
+        return self.__fetch_uncached(source)
+
+    def __fetch_uncached(self, source: FetchSource) -> FetchResult:
+        with metrics.phase(source.phase):
+            start = timer()
+            return self.__convert(source.system, source.fetch(), start)
+
+    def __device_sources(self) -> list[FetchSource]:
+        return [
+            FetchSource(
+                "Eero",
+                f"Eero devices{self.__network_suffix(network)}",
+                "eero_devices",
+                partial(self.eero_client.get_devices, network["url"]),
+                network["name"],
+            )
+            for network in self.networks
+        ]
+
+    def __fetch_sources(self) -> list[FetchSource]:
+        sources = self.__device_sources()
+        for network in self.networks:
+            sources.append(
+                FetchSource(
+                    "Eero",
+                    f"Eero network devices{self.__network_suffix(network)}",
+                    "eero_eeros",
+                    partial(self.eero_client.get_eeros, network["url"]),
+                    network["name"],
+                )
+            )
+        sources.append(
+            FetchSource(
+                "AdGuard",
+                "AdGuard clients",
+                "adguard_clients",
+                partial(self.executor.call, self.adguard_client.get_clients),
+            )
+        )
+        return sources
+
+    def __network_suffix(self, network: dict) -> str:
+        return f" from '{network['name']}'" if len(self.networks) > 1 else ""
+
+    def __build_tables(
+        self, results: list[WorkerResult]
+    ) -> tuple[DHCPClientTable, DHCPClientTable]:
+        self.__raise_errors(results)
+        eero_clients = []
+        adguard_clients = []
+        self.unparsed_clients = []
+        for result in results:
+            source = result.item
+            fetched = result.value
+            for client in fetched.skipped:
+                if isinstance(client, EeroClientDevice):
+                    name = client.nickname
+                else:
+                    name = client.name
+                self.__echo(
+                    f"{source.system} device missing MAC address, skipped device named '{name}'",
+                    fg="red",
+                )
+            self.__echo(
+                f"Fetched {len(fetched.clients)} {source.label} in {round(fetched.seconds, 2)}s"
+            )
+            if source.system == "Eero":
+                self.fetch_timings[source.network] = max(
+                    fetched.seconds, self.fetch_timings.get(source.network, 0)
+                )
+                eero_clients.extend(fetched.clients)
+            else:
+                adguard_clients.extend(fetched.clients)
+                self.unparsed_clients.extend(fetched.skipped)
+        return DHCPClientTable(eero_clients), DHCPClientTable(adguard_clients)
+
+    def fetch(self) -> tuple[DHCPClientTable, DHCPClientTable]:
+        sources = self.__fetch_sources()
+        results = WorkerPool(len(sources)).run(self.__fetch_source, sources)
+        return self.__build_tables(results)
+
+    def poll(self) -> DHCPClientTable:
+        sources = self.__device_sources()
+        results = WorkerPool(len(sources)).run(self.__fetch_source, sources)
+        self.__raise_errors(results)
+        return DHCPClientTable(
+            [client for result in results for client in result.value.clients]
+        )
+
+    def __targeted_fetch(
+        self, previous: DHCPClientTable
+    ) -> Optional[tuple[DHCPClientTable, DHCPClientTable, set[str]]]:
+        eero_table = self.poll()
+        delta = previous.compare(eero_table)
+        current = delta.discovered + [client for _, client in delta.changed]
+        identifiers = {i for client in current for i in client.identifiers}
+        identifiers.update(client.mac_identifier for client in delta.missing)
+        if not self.adguard_client.prefers_find(len(identifiers)):
+            return None
+        with metrics.phase("adguard_clients"):
+            start = timer()
+            fetched = self.__convert(
+                "AdGuard",
+                self.executor.call(
+                    self.adguard_client.find_clients, sorted(identifiers)
+                ),
+                start,
+            )
+        self.__echo(
+            f"Looked up {len(identifiers)} identifiers of changed Eero devices, "
+            f"found {len(fetched.clients)} AdGuard clients in {round(fetched.seconds, 2)}s"
+        )
+        self.unparsed_clients = []
+        affected = {client.mac_identifier for client in current + delta.missing}
+        return (
+            DHCPClientTable(
+                [
+                    client
+                    for client in eero_table.clients
+                    if client.mac_identifier in affected
+                ]
+            ),
+            DHCPClientTable(fetched.clients),
+            affected,
+        )
+
+    def __record_fingerprints(self, fingerprints: dict[str, str], skipped: set[str]):
+        if self.fingerprint_store is None:
+            return
+        self.fingerprint_store.replace(
+            {k: v for k, v in fingerprints.items() if k not in skipped}
+        )
+        self.fingerprint_store.save()
+
+    def __report_operations(
+        self,
+        diff: DHCPClientTableDiff,
+        removed: list[AdGuardSyncPlanAction],
+        delete: bool,
+        overwrite: bool,
+    ):
+        if (delete or overwrite) and not removed:
+            self.__echo("No removed clients found, skipped deletion")
+        self.planner.report_changes(diff)
+        if not diff.discovered:
+            self.__echo("No new clients found, skipped creation")
+
+    def __begin_journal(
+        self, fingerprints: dict[str, str], operations: list[Operation]
+    ) -> dict[int, int]:
+        if self.journal is None:
+            return {}
+        if not operations:
+            # Also drops an unfinished journal this run has made obsolete
+            self.journal.finish()
+            return {}
+        self.journal.begin(
+            {"host": self.adguard_client.base_url, "fingerprints": fingerprints},
+            [{"kind": kind, **asdict(action)} for kind, action in operations],
+        )
+        return {id(action): i for i, (_, action) in enumerate(operations)}
+
+    def __close_journal(self, finished: bool):
+        if self.journal is None:
+            return
+        if finished:
+            self.journal.finish()
+        else:
+            self.journal.close()
+
+    def sync(
+        self,
+        delete: bool = False,
+        overwrite: bool = False,
+        previous: DHCPClientTable = None,
+    ):
+        targeted = None
+        if previous is not None and not overwrite:
+            # Small Eero deltas only look up the AdGuard clients they touch
+            targeted = self.__targeted_fetch(previous)
+        if targeted is None:
+            eero_table, adguard_table = self.fetch()
+        else:
+            eero_table, adguard_table, affected = targeted
+
+        eero_table, dhcp_diff = self.planner.diff(eero_table, adguard_table, overwrite)
+        removed = self.planner.removed(
+            adguard_table, dhcp_diff, self.unparsed_clients, overwrite
+        )
+        fingerprints = self.planner.eero_fingerprints(eero_table)
+        if targeted is not None:
+            # Clients found by IP alone belong to devices that didn't change
+            removed = [action for action in removed if action.mac_address in affected]
+            fingerprints = self.planner.merge_fingerprints(fingerprints, affected)
+        operations = self.planner.operations(dhcp_diff, removed, delete, overwrite)
+        self.__report_operations(dhcp_diff, removed, delete, overwrite)
+        indices = self.__begin_journal(fingerprints, operations)
+        try:
+            skipped = self.__execute(group_operations(operations), indices)
+        except BaseException:
+            self.__close_journal(False)
+            raise
+        self.__record_fingerprints(fingerprints, skipped)
+        self.__close_journal(True)
+
+    def resume(self, state: JournalState):
+        with metrics.phase("adguard_clients"):
+            adguard_devices = self.executor.call(self.adguard_client.get_clients)
+        self.journal.resume()
+        try:
+            resumed = plan_resume(state, adguard_devices)
+            for index in resumed.settled:
+                self.journal.complete(index)
+            self.__echo(
+                f"Resuming sync started {state.header.get('started')}, "
+                f"{len(resumed.indices)} of {len(state.operations)} operations left, "
+                f"{resumed.applied} more found already applied in AdGuard"
+            )
+            for name in resumed.gone:
+                self.__echo(
+                    f"Skipped update of client no longer in AdGuard: '{name}'",
+                    fg="yellow",
+                )
+            skipped = self.__execute(resumed.groups, resumed.indices)
+        except BaseException:
+            self.__close_journal(False)
+            raise
+        self.__record_fingerprints(state.header["fingerprints"], skipped)
+        self.__close_journal(True)
+
+    def plan(self, delete: bool = False) -> AdGuardSyncPlan:
+        eero_table, adguard_table = self.fetch()
+        adguard_version = self.adguard_client.state_version
+        eero_table, dhcp_diff = self.planner.diff(eero_table, adguard_table)
+        self.planner.report_changes(dhcp_diff)
+        plan = AdGuardSyncPlan(
+            adguard_host=self.adguard_client.base_url,
+            adguard_version=adguard_version,
+            networks=[
+                {"name": network["name"], "url": network["url"]}
+                for network in self.networks
+            ],
+            fingerprints=self.planner.eero_fingerprints(eero_table),
+        )
+        removed = self.planner.removed(adguard_table, dhcp_diff)
+        for kind, action in self.planner.operations(dhcp_diff, removed, delete):
+            getattr(plan, kind).append(action)
+        return plan
+
+    def apply(self, plan: AdGuardSyncPlan):
+        self.executor.call(self.adguard_client.get_clients)
+        if self.adguard_client.state_version != plan.adguard_version:
+            raise click.ClickException(
+                "AdGuard clients changed since the plan was created, create a new plan"
+            )
+        groups = [
+            (kind, getattr(plan, kind))
+            for kind in ("update", "add", "delete")
+            if getattr(plan, kind)
+        ]
+        skipped = self.__execute(groups)
+        self.__record_fingerprints(plan.fingerprints, skipped)
@@ -0,0 +1,134 @@
+from typing import Optional
+
+import click
+
+from eero_adguard_sync.client import EeroClient
+from eero_adguard_sync.utils import SessionCache, metrics
+
+NETWORK_SELECT_PROMPT = """Multiple Eero networks found, please select by ID
+                
+{network_options}
+
+Network ID"""
+
+EERO_NETWORKS_TTL = 24 * 60 * 60
+
+
+def account_key(account: dict, cookie: str) -> str:
+    # log_id is the Eero user id, the session cookie only if no identity is sent
+    for field in ("log_id", "email", "phone"):
+        value = account.get(field)
+        if isinstance(value, dict):
+            value = value.get("value")
+        if value:
+            return SessionCache.key("eero_networks", field, str(value))
+    return SessionCache.key("eero_networks", "cookie", cookie)
+
+
+def fetch_networks(
+    eero_client: EeroClient,
+    selectors: tuple[str] = (),
+    session_cache: SessionCache = None,
+) -> list[dict]:
+    # Cookies point at the account the network list is cached for
+    cookie_key = SessionCache.key("eero_account", eero_client.session.cookie or "")
+    network_list = None
+    if session_cache is not None:
+        networks_key = session_cache.get(cookie_key)
+        if networks_key is not None:
+            network_list = session_cache.get(networks_key)
+        # Refetch when a selector names a network added since the list was cached
+        if network_list and all(
+            selector.lower() == "all"
+            or find_network(eero_client, network_list, selector) is not None
+            for selector in selectors
+        ):
+            track_session(eero_client, session_cache, cookie_key, networks_key)
+            return network_list
+    with metrics.phase("eero_account"):
+        account = eero_client.account()
+    network_list = [
+        {"name": network["name"], "url": network["url"]}
+        for network in account["networks"]["data"]
+    ]
+    if session_cache is not None and network_list:
+        # The account request may itself have refreshed the cookie
+        cookie = eero_client.session.cookie or ""
+        cookie_key = SessionCache.key("eero_account", cookie)
+        networks_key = account_key(account, cookie)
+        session_cache.set(networks_key, network_list, EERO_NETWORKS_TTL)
+        session_cache.set(cookie_key, networks_key, EERO_NETWORKS_TTL)
+        track_session(eero_client, session_cache, cookie_key, networks_key)
+    return network_list
+
+
+def track_session(
+    eero_client: EeroClient,
+    session_cache: SessionCache,
+    cookie_key: str,
+    networks_key: str,
+):
+    # A refreshed cookie still belongs to the account, move its pointer along
+    def store(cookie: str):
+        nonlocal cookie_key
+        session_cache.delete(cookie_key)
+        cookie_key = SessionCache.key("eero_account", cookie)
+        session_cache.set(cookie_key, networks_key, EERO_NETWORKS_TTL)
+
+    eero_client.login_hooks.append(store)
+
+
+def select_networks(
+    eero_client: EeroClient,
+    selectors: tuple[str] = (),
+    session_cache: SessionCache = None,
+) -> list[dict]:
+    network_list = fetch_networks(eero_client, selectors, session_cache)
+    network_count = len(network_list)
+    if not network_list:
+        raise click.ClickException("No Eero networks associated with this account")
+    if selectors:
+        if any(selector.lower() == "all" for selector in selectors):
+            networks = list(network_list)
+        else:
+            networks = []
+            for selector in selectors:
+                network = find_network(eero_client, network_list, selector)
+                if network is None:
+                    raise click.BadParameter(
+                        f"No Eero network matches '{selector}'",
+                        param_hint="'--network'",
+                    )
+                if network not in networks:
+                    networks.append(network)
+    else:
+        network_idx = 0
+        if network_count > 1:
+            network_options = "\n".join(
+                [f"{i}: {network['name']}" for i, network in enumerate(network_list)]
+            )
+            choice = click.Choice([str(i) for i in range(network_count)])
+            network_idx = int(
+                click.prompt(
+                    NETWORK_SELECT_PROMPT.format(network_options=network_options),
+                    type=choice,
+                    default=str(network_idx),
+                    show_choices=False,
+                )
+            )
+        networks = [network_list[network_idx]]
+    for network in networks:
+        click.echo(f"Selected network '{network['name']}'")
+    return networks
+
+
+def find_network(
+    eero_client: EeroClient, network_list: list[dict], selector: str
+) -> Optional[dict]:
+    network_id = eero_client.id_from_url(selector)
+    for network in network_list:
+        if network["name"].lower() == selector.lower():
+            return network
+        if network_id and eero_client.id_from_url(network["url"]) == network_id:
+            return network
+    return None
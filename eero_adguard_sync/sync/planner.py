@@ -0,0 +1,331 @@
+from collections import Counter
+from typing import Callable, Optional
+
+from eero_adguard_sync.client.adguard import AdGuardClient
+from eero_adguard_sync.models import (
+    AdGuardClientDevice,
+    AdGuardSyncPlanAction,
+    DHCPClient,
+    DHCPClientConflict,
+    DHCPClientDevice,
+    DHCPClientFieldChange,
+    DHCPClientTable,
+    DHCPClientTableDiff,
+)
+from eero_adguard_sync.utils import FingerprintStore, metrics
+
+# An AdGuard write, "add", "update" or "delete", with what to send
+Operation = tuple[str, AdGuardSyncPlanAction]
+
+
+def describe(client: DHCPClient) -> str:
+    return f"'{client.nickname}' [{client.mac_address}]"
+
+
+def plan_action(client: DHCPClient, payload: dict) -> AdGuardSyncPlanAction:
+    return AdGuardSyncPlanAction(client.mac_identifier, client.nickname, payload)
+
+
+def group_operations(
+    operations: list[Operation],
+) -> list[tuple[str, list[AdGuardSyncPlanAction]]]:
+    groups: list[tuple[str, list[AdGuardSyncPlanAction]]] = []
+    for kind, action in operations:
+        if not groups or groups[-1][0] != kind:
+            groups.append((kind, []))
+        groups[-1][1].append(action)
+    return groups
+
+
+class SyncPlanner:
+    def __init__(
+        self,
+        echo: Callable[..., None],
+        fingerprint_store: FingerprintStore = None,
+        full: bool = False,
+        rename_conflicts: bool = False,
+    ):
+        self.echo = echo
+        self.fingerprint_store = fingerprint_store
+        self.full = full
+        self.rename_conflicts = rename_conflicts
+
+    @staticmethod
+    def updated_device(
+        adguard_device: DHCPClient, eero_device: DHCPClient
+    ) -> AdGuardClientDevice:
+        new_device = AdGuardClientDevice.from_dhcp_client(eero_device)
+        new_device.params = adguard_device.instance.load_params()
+        return new_device
+
+    def report_changes(self, diff: DHCPClientTableDiff) -> bool:
+        if not diff.associated:
+            self.echo("No existing clients found, skipped update")
+            return False
+        unchanged_count = len(diff.unchanged)
+        if unchanged_count:
+            self.echo(f"Skipped {unchanged_count} unchanged clients")
+        if not diff.changed:
+            self.echo("No changed clients found, skipped update")
+            return False
+        field_counts = Counter(
+            change.field for changes in diff.changes.values() for change in changes
+        )
+        self.echo(
+            "Changed fields: "
+            + ", ".join(f"{k} ({v})" for k, v in sorted(field_counts.items()))
+        )
+        return True
+
+    def __resolve_conflict(
+        self,
+        client: DHCPClient,
+        conflicts: list[DHCPClientConflict],
+        existing: Optional[DHCPClient],
+        table: DHCPClientTable,
+    ) -> Optional[DHCPClient]:
+        if existing is None and not self.rename_conflicts:
+            for conflict in conflicts:
+                if conflict.field == "name":
+                    self.echo(
+                        f"Skipped device, duplicate name in Eero network: {describe(client)}",
+                        fg="red",
+                    )
+                else:
+                    self.echo(
+                        f"Skipped device, IP address {conflict.value} already used by "
+                        f"{describe(conflict.existing)}: {describe(client)}",
+                        fg="red",
+                    )
+            return None
+        conflict_ips = {i.value for i in conflicts if i.field == "ip"}
+        for conflict in conflicts:
+            if conflict.field == "ip":
+                self.echo(
+                    f"Dropped IP address {conflict.value} already used by "
+                    f"{describe(conflict.existing)} from {describe(client)}",
+                    fg="yellow",
+                )
+        nickname = client.nickname
+        if any(i.field == "name" for i in conflicts):
+            if (
+                not self.rename_conflicts
+                and existing.nickname not in table.index.by_name
+            ):
+                nickname = existing.nickname
+            else:
+                suffix = 2
+                while f"{client.nickname} ({suffix})" in table.index.by_name:
+                    suffix += 1
+                nickname = f"{client.nickname} ({suffix})"
+            self.echo(
+                f"Duplicate name in Eero network, using '{nickname}' for {describe(client)}",
+                fg="yellow",
+            )
+        return client.copy(
+            nickname=nickname,
+            ip_interfaces=[
+                i for i in client.ip_addresses if i.compressed not in conflict_ips
+            ],
+        )
+
+    def resolve_conflicts(
+        self, eero_table: DHCPClientTable, adguard_table: DHCPClientTable
+    ) -> DHCPClientTable:
+        projected_table = DHCPClientTable(list(adguard_table.clients))
+        adguard_clients = adguard_table.hash_table
+        # Clients already in AdGuard keep their names, new clients yield to them
+        ordered_clients = sorted(
+            eero_table.clients,
+            key=lambda client: client.mac_identifier not in adguard_clients,
+        )
+        resolved_clients = {}
+        for client in ordered_clients:
+            existing = adguard_clients.get(client.mac_identifier)
+            if existing is not None:
+                projected_table.remove(existing)
+            conflicts = projected_table.conflicts(client)
+            if conflicts:
+                client = self.__resolve_conflict(
+                    client, conflicts, existing, projected_table
+                )
+                if client is None:
+                    continue
+            projected_table.add(client)
+            resolved_clients[client.mac_identifier] = client
+        return DHCPClientTable(
+            [
+                resolved_clients[client.mac_identifier]
+                for client in eero_table.clients
+                if client.mac_identifier in resolved_clients
+            ]
+        )
+
+    def __apply_fingerprints(self, diff: DHCPClientTableDiff):
+        if self.fingerprint_store is None:
+            return
+        edited_devices = []
+        for adguard_device, eero_device in diff.associated:
+            mac_address = adguard_device.mac_identifier
+            fingerprint = self.fingerprint_store.get(mac_address)
+            if fingerprint is None:
+                continue
+            if adguard_device.instance.fingerprint != fingerprint:
+                edited_devices.append(describe(adguard_device))
+            eero_fingerprint = AdGuardClientDevice.from_dhcp_client(
+                eero_device
+            ).fingerprint
+            if not self.full and eero_fingerprint == fingerprint:
+                diff.changes.pop(mac_address, None)
+        for edited_device in edited_devices:
+            if self.full:
+                message = f"Restoring client edited outside of sync: {edited_device}"
+            else:
+                message = f"Preserved client edited outside of sync: {edited_device}"
+            self.echo(message, fg="yellow")
+
+    @staticmethod
+    def __reset_settings(diff: DHCPClientTableDiff):
+        for adguard_device, _ in diff.associated:
+            mac_address = adguard_device.mac_identifier
+            if mac_address in diff.changes:
+                continue
+            if AdGuardClient.has_custom_settings(adguard_device.instance.load_params()):
+                diff.changes[mac_address] = [
+                    DHCPClientFieldChange("settings", "custom", "default")
+                ]
+
+    @staticmethod
+    def __record_device_counts(
+        eero_table: DHCPClientTable,
+        adguard_table: DHCPClientTable,
+        diff: DHCPClientTableDiff,
+    ):
+        counts = {
+            "eero": len(eero_table.clients),
+            "adguard": len(adguard_table.clients),
+            "discovered": len(diff.discovered),
+            "changed": len(diff.changed),
+            "unchanged": len(diff.unchanged),
+            "missing": len(diff.missing),
+        }
+        for category, count in counts.items():
+            metrics.devices.set(count, category=category)
+
+    def diff(
+        self,
+        eero_table: DHCPClientTable,
+        adguard_table: DHCPClientTable,
+        overwrite: bool = False,
+    ) -> tuple[DHCPClientTable, DHCPClientTableDiff]:
+        with metrics.phase("diff"):
+            if overwrite:
+                # Clients about to be deleted don't hold on to their names and IPs
+                eero_clients = eero_table.hash_table
+                kept_table = DHCPClientTable(
+                    [
+                        client
+                        for client in adguard_table.hash_table.values()
+                        if client.mac_identifier in eero_clients
+                    ]
+                )
+                eero_table = self.resolve_conflicts(eero_table, kept_table)
+            else:
+                eero_table = self.resolve_conflicts(eero_table, adguard_table)
+            dhcp_diff = adguard_table.compare(eero_table, AdGuardClientDevice)
+            if overwrite:
+                self.__reset_settings(dhcp_diff)
+            else:
+                self.__apply_fingerprints(dhcp_diff)
+        self.__record_device_counts(eero_table, adguard_table, dhcp_diff)
+        # Only clients that are about to be updated need their raw params
+        update_set = {id(adguard_device) for adguard_device, _ in dhcp_diff.changed}
+        for adguard_device in adguard_table.clients:
+            if id(adguard_device) not in update_set:
+                adguard_device.instance.release_params()
+        return eero_table, dhcp_diff
+
+    @staticmethod
+    def removed(
+        adguard_table: DHCPClientTable,
+        diff: DHCPClientTableDiff,
+        unparsed_clients: list[DHCPClientDevice] = (),
+        overwrite: bool = False,
+    ) -> list[AdGuardSyncPlanAction]:
+        clients = list(diff.missing)
+        if overwrite:
+            # Clients that can't be matched to an Eero device by MAC go as well
+            indexed = adguard_table.hash_table
+            clients.extend(
+                client
+                for client in adguard_table.clients
+                if indexed.get(client.mac_identifier) is not client
+            )
+        actions = [
+            plan_action(client, AdGuardClient.remove_payload(client.nickname))
+            for client in clients
+        ]
+        if overwrite:
+            actions.extend(
+                AdGuardSyncPlanAction(
+                    "", client.name, AdGuardClient.remove_payload(client.name)
+                )
+                for client in unparsed_clients
+            )
+        return actions
+
+    @staticmethod
+    def eero_fingerprints(eero_table: DHCPClientTable) -> dict[str, str]:
+        return {
+            client.mac_identifier: AdGuardClientDevice.from_dhcp_client(
+                client
+            ).fingerprint
+            for client in eero_table.clients
+        }
+
+    def merge_fingerprints(
+        self, fingerprints: dict[str, str], affected: set[str]
+    ) -> dict[str, str]:
+        if self.fingerprint_store is None:
+            return fingerprints
+        merged = {
+            mac_address: fingerprint
+            for mac_address, fingerprint in self.fingerprint_store.fingerprints.items()
+            if mac_address not in affected
+        }
+        merged.update(fingerprints)
+        return merged
+
+    def operations(
+        self,
+        diff: DHCPClientTableDiff,
+        removed: list[AdGuardSyncPlanAction],
+        delete: bool = False,
+        overwrite: bool = False,
+    ) -> list[Operation]:
+        operations = {"add": [], "update": [], "delete": []}
+        for eero_device in diff.discovered:
+            device = AdGuardClientDevice.from_dhcp_client(eero_device)
+            operations["add"].append(
+                plan_action(eero_device, AdGuardClient.add_payload(device))
+            )
+        for adguard_device, eero_device in diff.changed:
+            if overwrite:
+                # Overwrite starts clients from scratch instead of keeping their settings
+                payload = AdGuardClient.replace_payload(
+                    adguard_device.nickname,
+                    AdGuardClientDevice.from_dhcp_client(eero_device),
+                )
+            else:
+                payload = AdGuardClient.update_payload(
+                    adguard_device.nickname,
+                    self.updated_device(adguard_device, eero_device),
+                )
+            operations["update"].append(plan_action(adguard_device, payload))
+        if delete or overwrite:
+            operations["delete"] = list(removed)
+        # Deleting first frees the names and IPs the Eero devices take over
+        order = (
+            ("delete", "update", "add") if overwrite else ("update", "add", "delete")
+        )
+        return [(kind, action) for kind in order for action in operations[kind]]
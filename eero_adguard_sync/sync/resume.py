@@ -0,0 +1,107 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+from eero_adguard_sync.models import (
+    AdGuardClientDevice,
+    AdGuardSyncPlanAction,
+    normalize_identifiers,
+)
+from eero_adguard_sync.sync.planner import Operation, group_operations
+from eero_adguard_sync.utils import JournalState
+
+
+@dataclass
+class ResumePlan:
+    groups: list[tuple[str, list[AdGuardSyncPlanAction]]]
+    # Journal index of each pending action, keyed by the action's id()
+    indices: dict[int, int]
+    settled: list[int] = field(default_factory=list)
+    applied: int = 0
+    gone: list[str] = field(default_factory=list)
+
+
+def same_ids(device: AdGuardClientDevice, data: dict) -> bool:
+    return device.normalized_ids == normalize_identifiers(data["ids"])
+
+
+def is_applied(device: Optional[AdGuardClientDevice], data: dict) -> bool:
+    if device is None or not same_ids(device, data):
+        return False
+    params = device.load_params() or {}
+    for key, value in data.items():
+        if key in ("ids", "name"):
+            continue
+        current = params.get(key, getattr(device, key, None))
+        if key == "tags":
+            value, current = sorted(value or []), sorted(current or [])
+        if current != value:
+            return False
+    return True
+
+
+def is_device(device: Optional[AdGuardClientDevice], mac_address: str) -> bool:
+    if device is None:
+        return False
+    # Unparsed clients have no MAC to tell them apart, only their name
+    if not mac_address:
+        return True
+    return normalize_identifiers([mac_address]) <= device.normalized_ids
+
+
+def claimed_names(
+    state: JournalState, clients: dict[str, AdGuardClientDevice]
+) -> set[str]:
+    # Names an applied add or rename of this run now holds
+    names = set()
+    for operation in state.operations:
+        payload = operation["payload"]
+        if operation["kind"] == "add":
+            data = payload
+        elif operation["kind"] == "update":
+            data = payload["data"]
+        else:
+            continue
+        device = clients.get(data["name"])
+        if device is not None and same_ids(device, data):
+            names.add(data["name"])
+    return names
+
+
+def plan_resume(
+    state: JournalState, adguard_devices: list[AdGuardClientDevice]
+) -> ResumePlan:
+    clients = {device.name: device for device in adguard_devices}
+    claimed = claimed_names(state, clients)
+    operations: list[Operation] = []
+    plan = ResumePlan([], {})
+    for index, operation in state.pending:
+        kind = operation["kind"]
+        action = AdGuardSyncPlanAction(
+            operation["mac_address"], operation["nickname"], operation["payload"]
+        )
+        payload = action.payload
+        # Overwrite deletes and renames first, a later add may already hold the name
+        original = is_device(clients.get(payload["name"]), action.mac_address)
+        # Completions written just before a crash may not have reached the journal
+        if kind == "add":
+            existing = clients.get(payload["name"])
+            done = existing is not None and same_ids(existing, payload)
+        elif kind == "update":
+            data = payload["data"]
+            done = is_applied(clients.get(data["name"]), data) and (
+                data["name"] == payload["name"] or not original
+            )
+            if not done and not original:
+                plan.gone.append(payload["name"])
+                plan.settled.append(index)
+                continue
+        else:
+            done = not original or payload["name"] in claimed
+        if done:
+            plan.applied += 1
+            plan.settled.append(index)
+            continue
+        operations.append((kind, action))
+        plan.indices[id(action)] = index
+    plan.groups = group_operations(operations)
+    return plan
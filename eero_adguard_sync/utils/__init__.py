@@ -1,2 +1,22 @@
-from .app_paths import app_paths
-from .base_url_session import BaseURLSession
+from .app_paths import app_paths, AppDataPath, EERO_COOKIE_PATH
+from .atomic_write import atomic_write, host_path
+from .worker_pool import WorkerPool, AsyncWorkerPool, WorkerResult
+from .fingerprint_store import FingerprintStore
+from .schedule import IntervalSchedule, AdaptiveSchedule, CronSchedule
+from .fetch_cache import FetchCache
+from .aimd_controller import AIMDController
+from .metrics import metrics, MetricsRegistry, MetricsServer
+from .profiler import SyncProfiler
+from .session_cache import SessionCache
+from .operation_journal import OperationJournal, JournalState
+from .json_stream import JSONStream
+from .retry import IDEMPOTENT_METHODS, RETRY_STATUS_CODES, backoff_time
+
+
+def __getattr__(name: str):
+    # requests is slow to import and only the HTTP clients need it
+    if name == "BaseURLSession":
+        from .base_url_session import BaseURLSession
+
+        return BaseURLSession
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,108 @@
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+class AIMDController:
+    def __init__(
+        self,
+        max_concurrency: int = 1,
+        max_rate: Optional[float] = None,
+        target_latency: float = 2,
+        increase: float = 1,
+        decrease: float = 0.5,
+        min_rate: float = 1,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("Parameter 'max_concurrency' must be at least 1")
+        if max_rate is not None and max_rate <= 0:
+            raise ValueError("Parameter 'max_rate' must be greater than zero")
+        if not 0 < decrease < 1:
+            raise ValueError("Parameter 'decrease' must be between 0 and 1")
+        self.max_concurrency = max_concurrency
+        self.max_rate = max_rate
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.min_rate = min(min_rate, max_rate) if max_rate else min_rate
+        self.concurrency = 1.0
+        self.rate = max_rate
+        self.in_flight = 0
+        self.__slow_start = True
+        self.__last_decrease = 0.0
+        self.__next_start = 0.0
+        self.__condition = threading.Condition()
+        self.__async_waiters: list["asyncio.Future"] = []
+
+    @property
+    def limit(self) -> int:
+        return max(1, int(self.concurrency))
+
+    def __reserve(self) -> float:
+        self.in_flight += 1
+        now = time.monotonic()
+        start = max(now, self.__next_start)
+        if self.rate is not None:
+            self.__next_start = start + 1 / self.rate
+        return start - now
+
+    def acquire(self) -> float:
+        with self.__condition:
+            while self.in_flight >= self.limit:
+                self.__condition.wait()
+            delay = self.__reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return time.monotonic()
+
+    async def acquire_async(self) -> float:
+        import asyncio
+
+        while True:
+            with self.__condition:
+                if self.in_flight < self.limit:
+                    delay = self.__reserve()
+                    break
+                # Waiting on the condition would block every request on the loop
+                released = asyncio.get_running_loop().create_future()
+                self.__async_waiters.append(released)
+            await released
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return time.monotonic()
+
+    @staticmethod
+    def __wake(waiter: "asyncio.Future"):
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def release(self, start: float, congested: bool = False):
+        now = time.monotonic()
+        with self.__condition:
+            self.in_flight -= 1
+            if congested or now - start > self.target_latency:
+                # Requests sent before the last decrease saw the old limit, only
+                # back off once per round trip
+                if start > self.__last_decrease:
+                    self.__last_decrease = now
+                    self.__slow_start = False
+                    self.concurrency = max(1.0, self.concurrency * self.decrease)
+                    if self.rate is not None:
+                        self.rate = max(self.min_rate, self.rate * self.decrease)
+            else:
+                if self.__slow_start:
+                    self.concurrency += self.increase
+                else:
+                    self.concurrency += self.increase / self.concurrency
+                self.concurrency = min(self.concurrency, float(self.max_concurrency))
+                if self.rate is not None:
+                    self.rate = min(
+                        self.max_rate, self.rate + self.increase / self.rate
+                    )
+            self.__condition.notify_all()
+            waiters, self.__async_waiters = self.__async_waiters, []
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(self.__wake, waiter)
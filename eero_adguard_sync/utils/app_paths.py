@@ -1,6 +1,40 @@
+import os
+from typing import Any, Optional
+
 from appdata import AppDataPaths
 
 
-app_paths = AppDataPaths()
-if app_paths.require_setup:
-    app_paths.setup()
+class LazyAppDataPaths:
+    def __init__(self):
+        self.__paths: Optional[AppDataPaths] = None
+
+    @property
+    def paths(self) -> AppDataPaths:
+        # Setup creates folders on disk, defer it until a path is actually used
+        if self.__paths is None:
+            paths = AppDataPaths()
+            if paths.require_setup:
+                paths.setup()
+            self.__paths = paths
+        return self.__paths
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.paths, name)
+
+
+class AppDataPath:
+    def __init__(self, *parts: str):
+        self.parts = parts
+
+    @property
+    def path(self) -> str:
+        return os.path.join(app_paths.app_data_path, *self.parts)
+
+    def __get__(self, instance: Any, owner: type) -> str:
+        return self.path
+
+
+app_paths = LazyAppDataPaths()
+
+# Shared with commands that must not import the Eero client
+EERO_COOKIE_PATH = AppDataPath("session.cookie")
@@ -0,0 +1,33 @@
+import os
+import re
+import tempfile
+from typing import Optional
+
+
+def atomic_write(path: str, content: str, mode: Optional[int] = None):
+    # Readers see the old file or the new one, never a partial write
+    path = os.path.abspath(path)
+    directory, name = os.path.split(path)
+    # mkstemp creates the file readable by its owner only
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def host_path(path: str, host: str) -> str:
+    # Per-host files sit next to the default one, e.g. journal-10.0.0.2.jsonl
+    name = re.sub(r"[^A-Za-z0-9.-]+", "_", host)
+    root, extension = os.path.splitext(path)
+    return f"{root}-{name}{extension}"
@@ -1,15 +1,104 @@
-from typing import Union
+import time
+from typing import Callable, Optional, Union
 from urllib.parse import urljoin
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from eero_adguard_sync.utils.retry import (
+    IDEMPOTENT_METHODS,
+    RETRY_STATUS_CODES,
+    backoff_time,
+)
+
+TimingHook = Callable[[str, str, Optional[int], float], None]
 
 
 class BaseURLSession(requests.Session):
-    def __init__(self, base_url: str):
+    idempotent_methods = IDEMPOTENT_METHODS
+    retry_status_codes = RETRY_STATUS_CODES
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: tuple[float, float] = (5, 30),
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 10,
+        pool_size: int = 10,
+    ):
         super().__init__()
         self.base_url = base_url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timing_hooks: list[TimingHook] = []
+        self.__urls: dict[str, str] = {}
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def url(self, endpoint: Union[str, bytes]) -> str:
+        if isinstance(endpoint, bytes):
+            endpoint = endpoint.decode("utf-8")
+        url = self.__urls.get(endpoint)
+        if url is None:
+            url = self.__urls[endpoint] = urljoin(self.base_url, endpoint)
+        return url
+
+    def backoff_time(self, attempt: int, response: requests.Response = None) -> float:
+        retry_after = ""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+        return backoff_time(attempt, self.backoff, self.max_backoff, retry_after)
+
+    @staticmethod
+    def __is_connect_error(error: requests.RequestException) -> bool:
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+    def __record(self, method: str, url: str, status: Optional[int], start: float):
+        elapsed = time.perf_counter() - start
+        for hook in self.timing_hooks:
+            hook(method, url, status, elapsed)
 
     def request(
-        self, method: str, url: Union[str, bytes], *args, **kwargs
+        self,
+        method: str,
+        url: Union[str, bytes],
+        *args,
+        idempotent: bool = None,
+        **kwargs,
     ) -> requests.Response:
-        return super().request(method, urljoin(self.base_url, url), *args, **kwargs)
+        url = self.url(url)
+        kwargs.setdefault("timeout", self.timeout)
+        if idempotent is None:
+            idempotent = method.upper() in self.idempotent_methods
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.__record(method, url, None, start)
+                # Requests that never connected can't have reached the server
+                retryable = idempotent or self.__is_connect_error(e)
+                if not retryable or attempt >= self.retries:
+                    raise
+                time.sleep(self.backoff_time(attempt))
+                attempt += 1
+                continue
+            self.__record(method, url, response.status_code, start)
+            if (
+                not idempotent
+                or response.status_code not in self.retry_status_codes
+                or attempt >= self.retries
+            ):
+                return response
+            response.close()
+            time.sleep(self.backoff_time(attempt, response))
+            attempt += 1
@@ -0,0 +1,26 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+
+class FetchCache:
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__entries: dict[Hashable, Future] = {}
+
+    def get(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        with self.__lock:
+            future = self.__entries.get(key)
+            owner = future is None
+            if owner:
+                future = self.__entries[key] = Future()
+        if owner:
+            try:
+                future.set_result(fetch())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def clear(self):
+        with self.__lock:
+            self.__entries = {}
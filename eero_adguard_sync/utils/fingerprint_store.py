@@ -0,0 +1,47 @@
+import json
+import os
+from typing import Optional
+
+from eero_adguard_sync.utils.app_paths import AppDataPath
+from eero_adguard_sync.utils.atomic_write import atomic_write
+
+
+class FingerprintStore:
+    # Version 1 fingerprinted ids as spelled by Eero, they never matched AdGuard's
+    schema_version = 2
+    default_path = AppDataPath("fingerprints.json")
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.__fingerprints = self.__load()
+
+    def __load(self) -> dict[str, str]:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("schema") != self.schema_version:
+            return {}
+        return dict(data.get("fingerprints", {}))
+
+    @property
+    def fingerprints(self) -> dict[str, str]:
+        return self.__fingerprints
+
+    def get(self, mac_address: str) -> Optional[str]:
+        return self.__fingerprints.get(mac_address)
+
+    def replace(self, fingerprints: dict[str, str]):
+        self.__fingerprints = dict(fingerprints)
+
+    def save(self):
+        data = {"schema": self.schema_version, "fingerprints": self.__fingerprints}
+        atomic_write(self.path, json.dumps(data, sort_keys=True))
+
+    def clear(self):
+        self.__fingerprints = {}
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
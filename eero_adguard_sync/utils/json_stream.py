@@ -0,0 +1,92 @@
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class JSONStream:
+    def __init__(self, chunks: Iterable[bytes]):
+        self.__chunks = iter(chunks)
+        self.__decoder = json.JSONDecoder()
+        self.__text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.__buffer = ""
+        self.__pos = 0
+        self.__exhausted = False
+
+    def __read(self) -> bool:
+        if self.__exhausted:
+            return False
+        try:
+            chunk = next(self.__chunks)
+        except StopIteration:
+            self.__exhausted = True
+            text = self.__text_decoder.decode(b"", final=True)
+        else:
+            text = self.__text_decoder.decode(chunk)
+        # Everything before the current position has been handed out already
+        self.__buffer = self.__buffer[self.__pos :] + text
+        self.__pos = 0
+        return True
+
+    def __peek(self) -> str:
+        while True:
+            self.__pos = WHITESPACE.match(self.__buffer, self.__pos).end()
+            if self.__pos < len(self.__buffer):
+                return self.__buffer[self.__pos]
+            if not self.__read():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def __expect(self, chars: str) -> str:
+        char = self.__peek()
+        if char not in chars:
+            raise ValueError(
+                f"Expected one of {chars!r} at offset {self.__pos}, got {char!r}"
+            )
+        self.__pos += 1
+        return char
+
+    def __value(self) -> Any:
+        self.__peek()
+        while True:
+            try:
+                value, end = self.__decoder.raw_decode(self.__buffer, self.__pos)
+            except json.JSONDecodeError:
+                if self.__read():
+                    continue
+                raise
+            # A number running into the end of the buffer may continue in the next chunk
+            if end < len(self.__buffer) or not self.__read():
+                self.__pos = end
+                return value
+
+    def __items(self) -> Iterator[Any]:
+        if self.__peek() == "]":
+            self.__pos += 1
+            return
+        while True:
+            yield self.__value()
+            if self.__expect(",]") == "]":
+                return
+
+    def iter_array(self, key: str) -> Iterator[Any]:
+        self.__expect("{")
+        if self.__peek() == "}":
+            return
+        while True:
+            name = self.__value()
+            self.__expect(":")
+            if self.__peek() == "[":
+                self.__pos += 1
+                # Other arrays are skipped an element at a time rather than held whole
+                items = self.__items()
+                if name == key:
+                    yield from items
+                else:
+                    for _ in items:
+                        pass
+            else:
+                self.__value()
+            if self.__expect(",}") == "}":
+                return
@@ -0,0 +1,331 @@
+import json
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, Optional, Protocol
+from urllib.parse import urlparse
+
+from eero_adguard_sync.utils.atomic_write import atomic_write
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class PhaseListener(Protocol):
+    def phase_started(self, name: str): ...
+
+    def phase_finished(self, name: str): ...
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(
+                f"Metric '{self.name}' expects labels {list(self.labels)}, "
+                f"got {sorted(labels)}"
+            )
+        return tuple(str(labels[i]) for i in self.labels)
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        with self._lock:
+            return [
+                (self.name, dict(zip(self.labels, key)), value)
+                for key, value in sorted(self._values.items())
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, value: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        samples = []
+        for name, labels, (counts, total) in super().samples():
+            for bound, count in zip(self.buckets, counts):
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                samples.append((f"{name}_bucket", {**labels, "le": le}, count))
+            samples.append((f"{name}_sum", labels, total))
+            samples.append((f"{name}_count", labels, counts[-1]))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.__metrics: dict[str, Metric] = {}
+        self.__lock = threading.Lock()
+
+    def __register(self, metric: Metric) -> Metric:
+        with self.__lock:
+            existing = self.__metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric '{metric.name}' is already registered")
+                return existing
+            self.__metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self.__register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self.__register(Gauge(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.__register(Histogram(name, help, labels, buckets))
+
+    @property
+    def metrics(self) -> list[Metric]:
+        with self.__lock:
+            return list(self.__metrics.values())
+
+    @staticmethod
+    def __escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    @staticmethod
+    def __format_value(value: float) -> str:
+        if value == math.inf:
+            return "+Inf"
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+    def to_prometheus(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {self.__escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                label_str = ",".join(
+                    f'{k}="{self.__escape(v)}"' for k, v in labels.items()
+                )
+                if label_str:
+                    name = f"{name}{{{label_str}}}"
+                lines.append(f"{name} {self.__format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> dict:
+        return {
+            metric.name: {
+                "type": metric.type,
+                "help": metric.help,
+                "samples": [
+                    {"name": name, "labels": labels, "value": value}
+                    for name, labels, value in metric.samples()
+                    if value != math.inf
+                ],
+            }
+            for metric in self.metrics
+        }
+
+    def write(self, path: str):
+        # Prometheus' textfile collector may read at any time, replace atomically
+        if path.endswith(".json"):
+            content = json.dumps(self.to_dict(), indent=2)
+        else:
+            content = self.to_prometheus()
+        atomic_write(path, content, 0o644)
+
+
+class SyncMetrics(MetricsRegistry):
+    def __init__(self):
+        super().__init__()
+        self.phase_duration = self.histogram(
+            "eag_sync_phase_duration_seconds",
+            "Duration of each sync phase",
+            ("phase",),
+        )
+        self.last_phase_duration = self.gauge(
+            "eag_sync_last_phase_duration_seconds",
+            "Duration of the most recent run of each sync phase",
+            ("phase",),
+        )
+        self.requests = self.counter(
+            "eag_sync_http_requests_total",
+            "HTTP requests sent to Eero and AdGuard Home",
+            ("service", "method", "endpoint", "status"),
+        )
+        self.request_errors = self.counter(
+            "eag_sync_http_request_errors_total",
+            "HTTP requests that failed or returned an error status",
+            ("service", "method", "endpoint"),
+        )
+        self.request_duration = self.histogram(
+            "eag_sync_http_request_duration_seconds",
+            "HTTP request latency",
+            ("service", "method", "endpoint"),
+        )
+        self.devices = self.gauge(
+            "eag_sync_devices",
+            "Devices seen in the most recent sync by diff category",
+            ("category",),
+        )
+        self.runs = self.counter(
+            "eag_sync_runs_total",
+            "Completed sync runs by result",
+            ("result",),
+        )
+        self.last_run_duration = self.gauge(
+            "eag_sync_last_run_duration_seconds",
+            "Duration of the most recent sync run",
+        )
+        self.last_run_timestamp = self.gauge(
+            "eag_sync_last_run_timestamp_seconds",
+            "Unix time the most recent sync run finished",
+        )
+        self.last_success_timestamp = self.gauge(
+            "eag_sync_last_success_timestamp_seconds",
+            "Unix time the most recent successful sync run finished",
+        )
+        self.phase_listeners: list[PhaseListener] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        for listener in self.phase_listeners:
+            listener.phase_started(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phase_duration.observe(elapsed, phase=name)
+            self.last_phase_duration.set(elapsed, phase=name)
+            for listener in self.phase_listeners:
+                listener.phase_finished(name)
+
+    @staticmethod
+    def endpoint(url: str) -> str:
+        path = urlparse(url).path if "://" in url else url
+        return re.sub(r"(?<=/)\d+(?=/|$)", "{id}", "/" + path.lstrip("/"))
+
+    def observe_request(
+        self,
+        service: str,
+        method: str,
+        url: str,
+        status: Optional[int],
+        seconds: float,
+    ):
+        endpoint = self.endpoint(url)
+        method = method.upper()
+        self.requests.inc(
+            service=service,
+            method=method,
+            endpoint=endpoint,
+            status=status if status is not None else "error",
+        )
+        self.request_duration.observe(
+            seconds, service=service, method=method, endpoint=endpoint
+        )
+        if status is None or status >= 400:
+            self.request_errors.inc(service=service, method=method, endpoint=endpoint)
+
+    def record_run(self, success: bool, seconds: float):
+        now = time.time()
+        self.runs.inc(result="success" if success else "failure")
+        self.last_run_duration.set(seconds)
+        self.last_run_timestamp.set(now)
+        if success:
+            self.last_success_timestamp.set(now)
+
+
+class MetricsServer:
+    def __init__(self, registry: MetricsRegistry, host: str = "", port: int = 9100):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.__server: Optional[ThreadingHTTPServer] = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args):
+                pass
+
+        self.__server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self.__server.server_address[1]
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+
+metrics = SyncMetrics()
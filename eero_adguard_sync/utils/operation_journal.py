@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import IO, Optional
+
+from eero_adguard_sync.utils.app_paths import AppDataPath
+
+
+@dataclass
+class JournalState:
+    header: dict
+    operations: list[dict]
+    completed: set[int] = field(default_factory=set)
+
+    @property
+    def pending(self) -> list[tuple[int, dict]]:
+        return [
+            (i, operation)
+            for i, operation in enumerate(self.operations)
+            if i not in self.completed
+        ]
+
+
+class OperationJournal:
+    schema_version = 1
+    default_path = AppDataPath("journal.jsonl")
+
+    def __init__(self, path: str, batch_size: int = 64, flush_interval: float = 0.5):
+        self.path = os.path.abspath(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.__lock = threading.Lock()
+        self.__file: Optional[IO[str]] = None
+        self.__buffer: list[str] = []
+        self.__last_flush = 0.0
+
+    def load(self) -> Optional[JournalState]:
+        try:
+            with open(self.path, "r") as f:
+                lines = f.readlines()
+        except IOError:
+            return None
+        state = None
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # The last line may be cut short by the crash being recovered from
+                continue
+            kind = record.pop("type", None)
+            if kind == "begin":
+                if record.pop("schema", None) != self.schema_version:
+                    return None
+                state = JournalState(record, [])
+            elif state is None:
+                continue
+            elif kind == "op":
+                state.operations.append(record["operation"])
+            elif kind == "done":
+                state.completed.add(record["index"])
+        if state is None or not state.pending:
+            return None
+        return state
+
+    def __open(self, mode: str):
+        self.__file = open(self.path, mode)
+        self.__last_flush = time.monotonic()
+
+    def __write(self, records: list[dict]):
+        self.__buffer.extend(json.dumps(record) + "\n" for record in records)
+
+    def __flush(self):
+        if self.__file is None or not self.__buffer:
+            return
+        self.__file.write("".join(self.__buffer))
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        self.__buffer = []
+        self.__last_flush = time.monotonic()
+
+    def begin(self, header: dict, operations: list[dict]):
+        # Every operation is on disk before the first one is sent
+        with self.__lock:
+            self.__open("w")
+            self.__write(
+                [
+                    {
+                        "type": "begin",
+                        "schema": self.schema_version,
+                        "started": datetime.now().isoformat(timespec="seconds"),
+                        **header,
+                    },
+                    *({"type": "op", "operation": i} for i in operations),
+                ]
+            )
+            self.__flush()
+
+    def resume(self):
+        with self.__lock:
+            self.__open("a")
+
+    def complete(self, index: int):
+        with self.__lock:
+            if self.__file is None:
+                return
+            self.__write([{"type": "done", "index": index}])
+            # Completions lost to a crash are found again by checking AdGuard
+            if (
+                len(self.__buffer) >= self.batch_size
+                or time.monotonic() - self.__last_flush >= self.flush_interval
+            ):
+                self.__flush()
+
+    def close(self):
+        with self.__lock:
+            if self.__file is None:
+                return
+            self.__flush()
+            self.__file.close()
+            self.__file = None
+
+    def finish(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.__buffer = []
+                self.__file.close()
+                self.__file = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,197 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class PhaseProfile:
+    name: str
+    seconds: float = 0
+    runs: int = 0
+    samples: int = 0
+    self_samples: Counter = field(default_factory=Counter)
+    total_samples: Counter = field(default_factory=Counter)
+    allocations: Counter = field(default_factory=Counter)
+    allocation_counts: Counter = field(default_factory=Counter)
+    peak_memory: int = 0
+
+
+class SyncProfiler:
+    def __init__(self, interval: float = 0.01, top: int = 15, frames: int = 1):
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        self.phases: dict[str, PhaseProfile] = {}
+        self.stacks: Counter = Counter()
+        self.__active: dict[int, list[tuple[str, float, tracemalloc.Snapshot]]] = {}
+        self.__locations: dict[str, str] = {}
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+        self.__owns_tracemalloc = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.__owns_tracemalloc = True
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__sample_loop, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        if self.__owns_tracemalloc:
+            tracemalloc.stop()
+            self.__owns_tracemalloc = False
+
+    def __enter__(self) -> "SyncProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def __phase(self, name: str) -> PhaseProfile:
+        if name not in self.phases:
+            self.phases[name] = PhaseProfile(name)
+        return self.phases[name]
+
+    def __location(self, filename: str) -> str:
+        location = self.__locations.get(filename)
+        if location is None:
+            location = filename
+            for path in sorted(sys.path, key=len, reverse=True):
+                if path and filename.startswith(path + os.sep):
+                    location = os.path.relpath(filename, path)
+                    break
+            self.__locations[filename] = location
+        return location
+
+    def __snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ]
+        )
+
+    def phase_started(self, name: str):
+        snapshot = self.__snapshot()
+        tracemalloc.reset_peak()
+        with self.__lock:
+            self.__active.setdefault(threading.get_ident(), []).append(
+                (name, time.perf_counter(), snapshot)
+            )
+
+    def phase_finished(self, name: str):
+        ident = threading.get_ident()
+        with self.__lock:
+            stack = self.__active[ident]
+            # Coroutines interleave phases on one thread, they may end out of order
+            index = max(i for i, entry in enumerate(stack) if entry[0] == name)
+            _, start, before = stack.pop(index)
+            if not stack:
+                del self.__active[ident]
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        diff = self.__snapshot().compare_to(before, "lineno")
+        with self.__lock:
+            phase = self.__phase(name)
+            phase.seconds += elapsed
+            phase.runs += 1
+            phase.peak_memory = max(phase.peak_memory, peak)
+            for stat in diff:
+                if stat.size_diff <= 0:
+                    continue
+                frame = stat.traceback[0]
+                site = f"{self.__location(frame.filename)}:{frame.lineno}"
+                phase.allocations[site] += stat.size_diff
+                phase.allocation_counts[site] += stat.count_diff
+
+    def __frame_label(self, frame) -> str:
+        code = frame.f_code
+        name = getattr(code, "co_qualname", code.co_name)
+        return f"{name} ({self.__location(code.co_filename)}:{code.co_firstlineno})"
+
+    def __sample_loop(self):
+        own = threading.get_ident()
+        while not self.__stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self.__lock:
+                if not self.__active:
+                    continue
+                phases = {ident: stack[-1] for ident, stack in self.__active.items()}
+                # Worker threads without a phase of their own work for the newest one
+                latest = max(phases.values(), key=lambda entry: entry[1])[0]
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    entry = phases.get(ident)
+                    self.__record(entry[0] if entry else latest, frame)
+
+    def __record(self, phase_name: str, frame):
+        stack = []
+        while frame is not None:
+            stack.append(self.__frame_label(frame))
+            frame = frame.f_back
+        stack.reverse()
+        phase = self.__phase(phase_name)
+        phase.samples += 1
+        phase.self_samples[stack[-1]] += 1
+        phase.total_samples.update(set(stack))
+        self.stacks[";".join([phase_name, *stack])] += 1
+
+    @staticmethod
+    def __format_size(size: int) -> str:
+        for unit in ("B", "KiB", "MiB"):
+            if abs(size) < 1024:
+                return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+            size /= 1024
+        return f"{size:.1f} GiB"
+
+    def report(self) -> str:
+        lines = [f"Sync profile, sampled every {round(self.interval * 1000, 1)}ms"]
+        with self.__lock:
+            phases = list(self.phases.values())
+        for phase in phases:
+            lines.append("")
+            lines.append(
+                f"Phase '{phase.name}': {round(phase.seconds, 3)}s over {phase.runs} "
+                f"run(s), {phase.samples} samples, "
+                f"peak traced memory {self.__format_size(phase.peak_memory)}"
+            )
+            if phase.samples:
+                lines.append("  Top functions by samples (self, total):")
+                for label, count in phase.self_samples.most_common(self.top):
+                    total = phase.total_samples[label]
+                    lines.append(
+                        f"    {count / phase.samples:6.1%} {total / phase.samples:6.1%}  {label}"
+                    )
+            if phase.allocations:
+                lines.append("  Top allocation sites retained at phase end:")
+                for site, size in phase.allocations.most_common(self.top):
+                    count = phase.allocation_counts[site]
+                    lines.append(
+                        f"    {self.__format_size(size):>10} {count:>8} blocks  {site}"
+                    )
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.report())
+
+    def write_stacks(self, path: str):
+        # Collapsed stack format, readable by flamegraph.pl, speedscope and inferno
+        with self.__lock:
+            stacks = sorted(self.stacks.items())
+        with open(path, "w") as f:
+            for stack, count in stacks:
+                f.write(f"{stack} {count}\n")
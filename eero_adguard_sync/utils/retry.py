@@ -0,0 +1,13 @@
+import random
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+def backoff_time(
+    attempt: int, backoff: float = 0.5, max_backoff: float = 10, retry_after: str = ""
+) -> float:
+    if retry_after.isdigit():
+        return min(float(retry_after), max_backoff)
+    # Full jitter keeps concurrent workers from retrying in lockstep
+    return random.uniform(0, min(max_backoff, backoff * 2**attempt))
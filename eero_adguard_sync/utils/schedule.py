@@ -0,0 +1,128 @@
+import random
+from datetime import datetime, timedelta
+
+
+class IntervalSchedule:
+    def __init__(self, seconds: float, jitter: float = 0):
+        if seconds <= 0:
+            raise ValueError("Interval must be greater than zero")
+        self.seconds = seconds
+        self.jitter = jitter
+
+    def next_run(self, after: datetime) -> datetime:
+        return after + timedelta(seconds=self.seconds + random.uniform(0, self.jitter))
+
+    def __str__(self) -> str:
+        return f"every {self.seconds}s"
+
+
+class AdaptiveSchedule:
+    def __init__(
+        self,
+        min_seconds: float,
+        max_seconds: float,
+        backoff: float = 2,
+        jitter: float = 0,
+    ):
+        if min_seconds <= 0:
+            raise ValueError("Interval must be greater than zero")
+        if max_seconds < min_seconds:
+            raise ValueError("Maximum interval must not be less than minimum interval")
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.backoff = backoff
+        self.jitter = jitter
+        self.seconds = min_seconds
+
+    def record(self, changed: bool):
+        if changed:
+            self.seconds = self.min_seconds
+        else:
+            self.seconds = min(self.seconds * self.backoff, self.max_seconds)
+
+    def next_run(self, after: datetime) -> datetime:
+        return after + timedelta(seconds=self.seconds + random.uniform(0, self.jitter))
+
+    def __str__(self) -> str:
+        return f"every {self.min_seconds}s, backing off to {self.max_seconds}s"
+
+
+class CronSchedule:
+    field_ranges = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str, jitter: float = 0):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(
+                f"Cron expression must have 5 fields, got {len(fields)}: '{expression}'"
+            )
+        self.expression = expression
+        self.jitter = jitter
+        (
+            self.minutes,
+            self.hours,
+            self.days,
+            self.months,
+            weekdays,
+        ) = [
+            self.__parse_field(field, *bounds)
+            for field, bounds in zip(fields, self.field_ranges)
+        ]
+        self.weekdays = {i % 7 for i in weekdays}
+        self.__any_day = fields[2] == "*"
+        self.__any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def __parse_field(field: str, low: int, high: int) -> set[int]:
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_str = part.split("/", 1)
+                step = int(step_str)
+                if step < 1:
+                    raise ValueError(f"Invalid cron step: '{field}'")
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start_str, end_str = part.split("-", 1)
+                start, end = int(start_str), int(end_str)
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field out of range: '{field}'")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def __day_matches(self, moment: datetime) -> bool:
+        day_match = moment.day in self.days
+        # Cron weekdays start on Sunday, Python's start on Monday
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.__any_day or self.__any_weekday:
+            return day_match and weekday_match
+        return day_match or weekday_match
+
+    def next_run(self, after: datetime) -> datetime:
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (
+                    moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)
+                ).replace(day=1)
+                continue
+            if not self.__day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+                continue
+            if moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+                continue
+            return moment + timedelta(seconds=random.uniform(0, self.jitter))
+        raise ValueError(f"Cron expression never matches: '{self.expression}'")
+
+    def __str__(self) -> str:
+        return f"cron '{self.expression}'"
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Optional
+
+from eero_adguard_sync.utils.app_paths import AppDataPath
+from eero_adguard_sync.utils.atomic_write import atomic_write
+
+
+class SessionCache:
+    schema_version = 1
+    default_path = AppDataPath("sessions.json")
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.__lock = threading.Lock()
+        self.__entries = self.__load()
+
+    @staticmethod
+    def key(namespace: str, *parts: str) -> str:
+        # Hosts, usernames and cookies are hashed so the file doesn't list accounts
+        digest = hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+        return f"{namespace}:{digest[:32]}"
+
+    def __load(self) -> dict[str, dict]:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("schema") != self.schema_version:
+            return {}
+        now = time.time()
+        return {
+            key: entry
+            for key, entry in dict(data.get("entries", {})).items()
+            if isinstance(entry, dict) and entry.get("expires", 0) > now
+        }
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires"] <= time.time():
+                del self.__entries[key]
+                return None
+            return entry["value"]
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self.__lock:
+            self.__entries[key] = {"value": value, "expires": time.time() + ttl}
+            self.__save()
+
+    def delete(self, key: str):
+        with self.__lock:
+            if self.__entries.pop(key, None) is not None:
+                self.__save()
+
+    def __save(self):
+        data = {"schema": self.schema_version, "entries": self.__entries}
+        atomic_write(self.path, json.dumps(data, sort_keys=True))
+
+    def clear(self):
+        with self.__lock:
+            self.__entries = {}
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
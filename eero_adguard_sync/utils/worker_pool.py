@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Optional
+
+
+@dataclass
+class WorkerResult:
+    item: Any
+    value: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        concurrency: int = 1,
+        serialize_key: Optional[Callable[[Any], Hashable]] = None,
+    ):
+        if concurrency < 1:
+            raise ValueError("Parameter 'concurrency' must be at least 1")
+        self.concurrency = concurrency
+        self.serialize_key = serialize_key
+
+    def _group(self, items: list) -> list[list[int]]:
+        if self.serialize_key is None:
+            return [[i] for i in range(len(items))]
+        groups: dict[Hashable, list[int]] = {}
+        for i, item in enumerate(items):
+            groups.setdefault(self.serialize_key(item), []).append(i)
+        return list(groups.values())
+
+    def run(
+        self,
+        func: Callable[[Any], Any],
+        items: Iterable,
+        on_complete: Optional[Callable[[int], None]] = None,
+    ) -> list[WorkerResult]:
+        items = list(items)
+        results = [WorkerResult(item) for item in items]
+
+        def run_group(group: list[int]) -> int:
+            for i in group:
+                try:
+                    results[i].value = func(items[i])
+                except Exception as e:
+                    results[i].error = e
+            return len(group)
+
+        groups = self._group(items)
+        if self.concurrency == 1:
+            for group in groups:
+                count = run_group(group)
+                if on_complete:
+                    on_complete(count)
+            return results
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(run_group, group) for group in groups]
+            for future in as_completed(futures):
+                count = future.result()
+                if on_complete:
+                    on_complete(count)
+        return results
+
+
+class AsyncWorkerPool(WorkerPool):
+    async def run(
+        self,
+        func: Callable[[Any], Awaitable],
+        items: Iterable,
+        on_complete: Optional[Callable[[int], None]] = None,
+    ) -> list[WorkerResult]:
+        # Only loaded by the asyncio code paths, it's slow to import
+        import asyncio
+
+        items = list(items)
+        results = [WorkerResult(item) for item in items]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_group(group: list[int]):
+            for i in group:
+                async with semaphore:
+                    try:
+                        results[i].value = await func(items[i])
+                    except Exception as e:
+                        results[i].error = e
+            if on_complete:
+                on_complete(len(group))
+
+        await asyncio.gather(*[run_group(group) for group in self._group(items)])
+        return results